@@ -1,21 +1,17 @@
 # app.py
 
-import os
-import json
+import re
+import time
 import streamlit as st
-import requests
 from typing import List, Dict, Tuple
-import plotly.express as px
-from openai import OpenAI
-from bs4 import BeautifulSoup  # Ensure it's uncommented in your local env
-import feedparser
-from datetime import datetime, timedelta
+from datetime import datetime
 
-# ── Streamlit Config ───────────────────────────────────────
-st.set_page_config(page_title="TreasuryLens", layout="wide", initial_sidebar_state="expanded")
+import core
+from calendar_store import CalendarIndex, WEEKDAYS
+from prefetch_scheduler import PrefetchScheduler
 
-# ── Global CSS Injection ───────────────────────────────────
-st.markdown("""
+# ── Global CSS ─────────────────────────────────────────────
+GLOBAL_CSS = """
             
 <style>
 h1, h2, h3 {
@@ -72,93 +68,59 @@ h1, h2, h3 {
     font-size: 1rem;
   }
 </style>
-""", unsafe_allow_html=True)
-
-# ── API Keys ───────────────────────────────────────────────
-BING_KEY = st.secrets["bing"]["api_key"]
-BING_ENDPOINT = "https://api.bing.microsoft.com/v7.0/news/search"
-client = OpenAI(api_key=st.secrets["openai"]["api_key"])
-
-# ── Fetch Economic Calendar ────────────────────────────────
-
-import requests
-from datetime import datetime, timedelta
-from typing import List, Dict
-
-@st.cache_data(show_spinner=False)
-def scrape_calendar() -> List[Dict]:
-    api_key = st.secrets["tradingeconomics"]["api_key"]
-
-    today = datetime.today()
-    end_date = today + timedelta(days=4)
-
-    url = "https://api.tradingeconomics.com/calendar"
-    params = {
-        "c": api_key,
-        "country": "united states,eurozone,united kingdom,japan,china",
-        # "importance": "2,3",  # Optional - comment this for now
-        "start_date": today.strftime("%Y-%m-%d"),
-        "end_date": end_date.strftime("%Y-%m-%d")
-    }
+"""
 
+# ── Cached Fetchers ────────────────────────────────────────
+# Thin st.cache_data layers over core; upstream failures are shown here and
+# degrade to an empty list.
+@core.timed("fetch.calendar")
+def scrape_calendar(days: int, min_importance: int) -> CalendarIndex:
+    # Deliberately not st.cache_data: "today" has to be evaluated on every run, and
+    # the calendar store already limits upstream calls to missing or expired days.
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-
-        try:
-            data = r.json()
-        except Exception:
-            st.error("Received a malformed response (not JSON).")
-            return []
+        return core.load_calendar(days, min_importance)
+    except core.UpstreamError as e:
+        st.error(str(e))
+        return core.load_calendar(days, min_importance, fetch=False)
 
-        events = []
-        for item in data:
-            try:
-                dt = datetime.strptime(item["Date"], "%Y-%m-%dT%H:%M:%S")
-                events.append({
-                    "date": dt.strftime("%Y-%m-%d"),
-                    "weekday": dt.strftime("%a"),
-                    "region": item.get("Country", "Unknown"),
-                    "event": item.get("Category", "Event"),
-                })
-            except:
-                continue
-
-        return events
-
-    except Exception as e:
-        st.error(f"TradingEconomics API error: {e}")
-        return []
 
+def refresh_window(interval_key: str) -> int:
+    # Index of the current prefetch interval; as part of a cache key it expires the
+    # entry at the same cadence the scheduler refreshes on
+    return int(time.time() // core.section("prefetch").get(interval_key, 900))
 
 
-# ── Bing Headline Fetchers ────────────────────────────────
-@st.cache_data(show_spinner=False)
+# Timed outside the cache, so st.cache_data hits show up as near-zero samples.
+# Failures are raised out of the cached functions, so they are never cached, and
+# reported here; call these from the script thread only, since st.error is
+# dropped on worker threads.
+@core.timed("fetch.global_headlines")
 def fetch_global_headlines() -> List[str]:
     try:
-        params = {"q": "forex market news", "count": 30, "mkt": "en-US", "safeSearch": "Off"}
-        headers = {"Ocp-Apim-Subscription-Key": BING_KEY}
-        r = requests.get(BING_ENDPOINT, params=params, headers=headers)
-        r.raise_for_status()
-        data = r.json().get("value", [])
-        return [f"{a.get('name','')} — {a.get('description','')}" for a in data]
-    except Exception as e:
-        st.error(f"Error fetching global headlines: {e}")
+        return _fetch_global_headlines(refresh_window("global_interval_seconds"))
+    except core.UpstreamError as e:
+        st.error(str(e))
         return []
 
-@st.cache_data(show_spinner=False)
+
+@core.timed("fetch.currency_headlines")
 def fetch_currency_headlines(pair: str) -> List[str]:
     try:
-        params = {"q": f"{pair} forex news", "count": 20, "mkt": "en-US", "safeSearch": "Off"}
-        headers = {"Ocp-Apim-Subscription-Key": BING_KEY}
-        r = requests.get(BING_ENDPOINT, params=params, headers=headers)
-        r.raise_for_status()
-        data = r.json().get("value", [])
-        return [f"{a.get('name','')} — {a.get('description','')}" for a in data]
-    except Exception as e:
-        st.error(f"Error fetching headlines for {pair}: {e}")
+        return _fetch_currency_headlines(pair, refresh_window("pair_interval_seconds"))
+    except core.UpstreamError as e:
+        st.error(str(e))
         return []
 
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _fetch_global_headlines(window: int) -> List[str]:
+    return core.load_global_headlines()
+
+
+@st.cache_data(show_spinner=False, max_entries=4 * len(core.CURRENCY_PAIRS))
+def _fetch_currency_headlines(pair: str, window: int) -> List[str]:
+    return core.load_currency_headlines(pair)
+
 # ── Text Cleaner───────────────────────────────────────────
 
 def clean_text(text: str) -> str:
@@ -174,142 +136,113 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
-# ── GPT Analysis ───────────────────────────────────────────
-@st.cache_data(ttl=3600, show_spinner=False) 
-def analyze_with_gpt(snippets: List[str]) -> Tuple[List[str], str, Dict[str, int], str]:
-    if not snippets:
-        return [], "neutral", {"positive": 0, "neutral": 0, "negative": 0}, "No explanation available due to missing data."
-
-    joined = "\n".join(f"- {s}" for s in snippets)
-
-    prompt = f"""
-You are a highly experienced Forex trader with over 10 years of expertise in analyzing global currency markets. You’ve traded through rate hike cycles, QE tapers, geopolitical crises, and central bank pivots. Based on the input text (a set of recent news headlines and summaries), your job is to extract exactly FIVE high-impact market insights that are:
-
-1. Highly relevant to currency traders and institutional investors.
-2. Focused on macroeconomic developments, central bank signals, inflation trends, geopolitical risk, or surprise data points that could move FX markets.
-3. Written in a consistent, narrative progression — from macro themes to specific trade implications.
-4. Deeply analytical — avoid vague takeaways like “Fed to pause hikes” or “Euro may rise.” Each insight must include the **cause**, **effect**, and **market implication**.
-
-Use a professional, precise, and insight-rich tone. Your goal is to provide **immediate trading value**.
-
-Each takeaway should follow this structure:
-- **Headline-style summary** (bold)
-- 1-2 sentences of detailed analysis (include *why it matters*, *how it affects specific currencies*, and *what traders should watch next*)
-
----
-
-**EXAMPLE OUTPUT:**
-
-1. **Dollar faces fresh headwinds as Fed minutes signal a dovish pivot**  
-   The FOMC minutes reveal growing consensus to hold off on further hikes amid cooling labor market data. This could suppress USD demand short-term, especially against yield-seeking pairs like AUD and NZD.
-
-2. **Euro resilience supported by hawkish ECB tones despite growth concerns**  
-   ECB board members maintain a data-dependent but hawkish stance, citing sticky core inflation. EUR/USD may find support unless upcoming PMI data disappoints significantly.
-
-3. **JPY strengthens on safe haven flows amid Middle East tensions**  
-   Renewed geopolitical risk is prompting risk-off sentiment globally, benefitting JPY and CHF. Traders should monitor oil price spikes and U.S. defense positioning for directional cues.
-
-4. **Sterling under pressure as UK wage growth cools sharply**  
-   Slower-than-expected wage data dampens BoE’s tightening outlook. GBP/USD risks breaking below key support if CPI also moderates this week.
-
-5. **Emerging market currencies vulnerable as US 10Y yield rebounds**  
-   A sharp uptick in U.S. long-end yields is reversing recent capital flows to EMs. Currencies like INR, BRL, and ZAR could see renewed selling pressure, especially if U.S. retail sales surprise on the upside.
-
----
-
-Now, based on the above 5 insights, do the following:
-
-6. Assign an **overall sentiment** from one of the following five options:
-   - Positive
-   - Trending Positive
-   - Neutral
-   - Trending Negative
-   - Negative
-
-7. Provide a 2-3 sentence **explanation** for this sentiment label. Make this grounded in the themes you identified. Don’t be vague — clearly connect it to central bank tone, risk sentiment, data, or market reactions.
-
-8. Return a count of sentiment-bearing headlines, like:
-   {{ "positive": X, "neutral": Y, "negative": Z }}
-
----
-
-Respond only with a valid Python dictionary in this format:
-
-{{
-  "summary_points": [
-    "Insight 1 (headline + explanation)",
-    "Insight 2 (headline + explanation)",
-    "Insight 3 (headline + explanation)",
-    "Insight 4 (headline + explanation)",
-    "Insight 5 (headline + explanation)"
-  ],
-  "overall_sentiment": "Positive | Trending Positive | Neutral | Trending Negative | Negative",
-  "sentiment_explainer": "This week’s sentiment is [label] because ...",
-  "counts": {{ "positive": X, "neutral": Y, "negative": Z }}
-}}
-
-Here are the latest forex headlines:
-{joined}
-"""
-
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.0,
+# ── Renderer: Prompt Size ─────────────────────────────────
+def render_prompt_stats(scope: str):
+    build = core.get_prompt_stats().get(scope)
+    if build is not None:
+        st.caption(
+            f"Prompt: {build.prompt_tokens:,} tokens · {build.included} headlines included"
+            + (f", {build.dropped} dropped to fit the budget" if build.dropped else "")
         )
-        text = resp.choices[0].message.content
-        result = json.loads(text)
-
-        bullets = result.get("summary_points", [])
-        tone = result.get("overall_sentiment", "neutral")
-        explanation = result.get("sentiment_explainer", "No explanation provided.")
-        counts = result.get("counts", {})
-        for k in ("positive", "neutral", "negative"):
-            counts.setdefault(k, 0)
-
-        return bullets, tone, counts, explanation
 
-    except json.JSONDecodeError:
-        st.error("Could not parse GPT output.")
-        return [], "neutral", {"positive": 0, "neutral": 0, "negative": 0}, "No explanation (JSON error)."
 
-    except Exception as e:
-        st.error(f"GPT analysis failed: {e}")
-        return [], "neutral", {"positive": 0, "neutral": 0, "negative": 0}, "No explanation (exception occurred)."
+# ── Background Prefetch ───────────────────────────────────
+# Jobs call core directly rather than the st.cache_data wrappers, which would
+# otherwise hand back the same cached value on every refresh.
+@st.cache_resource(show_spinner=False)
+def get_scheduler() -> PrefetchScheduler:
+    # One scheduler per server process, shared by every session
+    cfg = core.section("prefetch")
+    scheduler = PrefetchScheduler(max_workers=cfg.get("max_workers", 4))
+    # Keeps the calendar store's days fresh; the UI reads the store directly
+    scheduler.register("calendar", core.load_calendar, cfg.get("calendar_interval_seconds", 3600))
+    if core.get_feed_ingestor() is not None:
+        # Polls feeds off the UI thread; headline fetches then read the latest snapshot
+        scheduler.register("feeds", core.poll_feeds, cfg.get("feeds_interval_seconds", 600))
+    if core.section("metrics").get("textfile"):
+        scheduler.register("metrics", core.write_metrics_textfile, cfg.get("metrics_interval_seconds", 15))
+    scheduler.register("global", core.analyze_global, cfg.get("global_interval_seconds", 900),
+                       is_good=lambda v: bool(v["result"][0]))
+    for pair in cfg.get("pairs", ["EUR/USD"]):
+        scheduler.register(f"pair:{pair}", lambda pair=pair: core.analyze_pair(pair), cfg.get("pair_interval_seconds", 900),
+                           is_good=lambda v: bool(v[0]))
+    if cfg.get("enabled", True):
+        scheduler.start()
+    return scheduler
+
+
+def render_freshness(name: str, fetched_at: float):
+    age = int(time.time() - fetched_at)
+    if age < 60:
+        label = "just now"
+    elif age < 3600:
+        label = f"{age // 60} min ago"
+    else:
+        label = f"{age // 3600} h {age % 3600 // 60} min ago"
+    refreshing = " · refreshing in background" if get_scheduler().is_refreshing(name) else ""
+    st.caption(f"🕒 Updated {label} ({datetime.fromtimestamp(fetched_at):%H:%M}){refreshing}")
+
+
+# ── Renderer: Sentiment Trend ─────────────────────────────
+TREND_RANGES = {"7 days": 7, "30 days": 30, "90 days": 90, "1 year": 365}
+
+
+@core.timed("render.sentiment_trend")
+def render_sentiment_trend(max_points: int = 200):
+    st.markdown("### 📈 Sentiment History")
+
+    history = core.get_sentiment_history()
+    scopes = history.scopes()
+    if not scopes:
+        st.caption("No analyses recorded yet.")
+        return
+
+    col_scope, col_range = st.columns([2, 3])
+    default = scopes.index("EUR/USD") if "EUR/USD" in scopes else 0
+    scope = col_scope.selectbox("Scope", scopes, index=default, key="trend_scope")
+    span = col_range.radio("Range", list(TREND_RANGES), horizontal=True, key="trend_range")
+
+    # Bucketed in SQLite, so at most max_points rows reach the chart however long the range
+    points = history.trend(scope, time.time() - TREND_RANGES[span] * 86400, max_points=max_points)
+    if not points:
+        st.caption(f"No {scope} analyses in the last {span}.")
+        return
+
+    import plotly.graph_objects as go
+
+    x = [datetime.fromtimestamp(p.ts) for p in points]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x, y=[p.tone for p in points], name="Overall sentiment", mode="lines+markers",
+                             customdata=[p.samples for p in points],
+                             hovertemplate="%{y:.2f} (%{customdata} analyses)<extra></extra>"))
+    fig.add_trace(go.Scatter(x=x, y=[p.balance for p in points], name="Headline balance", mode="lines",
+                             line=dict(dash="dot")))
+    fig.update_layout(yaxis=dict(range=[-1.05, 1.05], title="Negative ← → Positive"), height=320,
+                      margin=dict(l=0, r=0, t=10, b=0), legend=dict(orientation="h"),
+                      paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+    st.plotly_chart(fig, use_container_width=True)
 
 
 # ── Renderer: Week Ahead Grid ─────────────────────────────
-from collections import defaultdict
-from datetime import datetime, timedelta
-
- # See what’s coming from RSS
-
-
-def render_week_ahead_horizontal(events: List[Dict]):
+@core.timed("render.week_ahead")
+def render_week_ahead_horizontal(calendar: CalendarIndex, regions: List[str] = None):
     st.markdown("---")
-    st.markdown("### 📅 Week Ahead (Global Events)")
+    st.markdown("### 📅 Week Ahead (Global Events)" if calendar.days <= 7 else f"### 📅 Next {calendar.days} Days (Global Events)")
 
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+    days = WEEKDAYS[:5]
     cols = st.columns(len(days))
+    # Windows longer than a week put several dates in one weekday column
+    dated = calendar.days > 7
 
-    # Group events by weekday
-    grouped = {day: [] for day in days}
-    for ev in events:
-        wd = ev.get("weekday", "")
-        if wd in grouped:
-            grouped[wd].append(f"**{ev['region']}:** {ev['event']}")
-
-    # Render each column (day)
+    # Render each column (day); events are already grouped by weekday and region
     for i, day in enumerate(days):
         with cols[i]:
             st.markdown(f"**{day}**")
-            if grouped[day]:
-                for item in grouped[day]:
-                    st.markdown(f"- {item}")
+            events = calendar.cell(day, regions)
+            if events:
+                for ev in events:
+                    prefix = f"{datetime.strptime(ev['date'], '%Y-%m-%d'):%d %b} · " if dated else ""
+                    st.markdown(f"- {prefix}**{ev['region']}:** {ev['event']}")
             else:
                 st.markdown("*No events*")
 
@@ -329,7 +262,21 @@ def get_sentiment_class(sentiment: str) -> str:
         return "background-color: #ffcc00; color: black; padding: 6px 12px; border-radius: 6px; display: inline-block;"
 
 
+# ── Renderer: Streaming Preview ──────────────────
+def stream_points_into(placeholder, title: str):
+    # Returns an on_point callback that appends each insight to the placeholder as it arrives.
+    # The caller clears the placeholder once the full panel can be rendered.
+    box = placeholder.container()
+    box.markdown(f"""<div class="card"><h3>{title}</h3></div>""", unsafe_allow_html=True)
+
+    def on_point(point: str):
+        box.markdown(f"- {point}")
+
+    return on_point
+
+
 # ── Renderer: Global Panel ───────────────────────
+@core.timed("render.global_panel")
 def render_global_panel(bullets: List[str], overall: str, breakdown: Dict[str,int], explanation: str):
     st.markdown("### 🌍 Global FX Sentiment")
 
@@ -354,13 +301,40 @@ def render_global_panel(bullets: List[str], overall: str, breakdown: Dict[str,in
             st.markdown(f"- {b}")
 
 
+    import plotly.express as px
+
     fig = px.pie(names=list(breakdown.keys()), values=list(breakdown.values()), hole=0.4)
     fig.update_traces(textinfo="percent+label", marker=dict(line=dict(color="white", width=2)))
     fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
     st.plotly_chart(fig, use_container_width=True)
 
 
+# ── Renderer: Headline Scores ────────────────────
+@core.timed("render.headline_scores")
+def render_headline_scores(snippets: List[str], top: int = 5):
+    # Per-headline scores from the local scorer that also produces the pie chart counts
+    if not snippets:
+        return
+    from sentiment_scorer import default_scorer
+
+    scored = default_scorer().score_headlines(snippets)
+    order = scored.scores.argsort()
+    with st.expander("Headline scores"):
+        col_pos, col_neg = st.columns(2)
+        with col_pos:
+            st.markdown("**Most positive**")
+            for i in order[::-1][:top]:
+                if scored.scores[i] > 0:
+                    st.markdown(f"- `{scored.scores[i]:+.2f}` {snippets[i].split(' — ')[0]}")
+        with col_neg:
+            st.markdown("**Most negative**")
+            for i in order[:top]:
+                if scored.scores[i] < 0:
+                    st.markdown(f"- `{scored.scores[i]:+.2f}` {snippets[i].split(' — ')[0]}")
+
+
 # ── Renderer: Currency Panel ─────────────────────
+@core.timed("render.currency_panel")
 def render_currency_panel(bullets: List[str], overall: str, breakdown: Dict[str,int], explanation: str):
     st.markdown("### 💱 Currency-Pair Deep Dive")
 
@@ -378,39 +352,157 @@ def render_currency_panel(bullets: List[str], overall: str, breakdown: Dict[str,
         else:
             st.markdown(f"- {b}")
 
+    import plotly.express as px
+
     fig = px.pie(names=list(breakdown.keys()), values=list(breakdown.values()), hole=0.4)
     fig.update_traces(textinfo="percent+label", marker=dict(line=dict(color="white", width=2)))
     fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
     st.plotly_chart(fig, use_container_width=True)
 
 
+# ── Watchlist: Concurrent Pair Analysis ──────────────
+def analyze_pair(pair: str) -> Tuple[List[str], str, Dict[str, int], str]:
+    # Runs on a worker thread: an upstream failure raises and becomes this pair's tile error
+    prefetched, _ = get_scheduler().get(f"pair:{pair}")
+    if prefetched is not None:
+        return prefetched
+    return core.analyze_incremental(pair, core.load_currency_headlines(pair))
+
+
+# ── Renderer: Watchlist Grid ─────────────────────
+def render_pair_tile(pair: str, result, error: str = None):
+    st.markdown(f"**{pair}**")
+    if error:
+        st.warning(error)
+        return
+
+    bullets, overall, breakdown, explanation = result
+    sentiment_style = get_sentiment_class(overall)
+    st.markdown(f"""<div style="{sentiment_style}; margin-bottom: 0.5rem;">{overall}</div>""", unsafe_allow_html=True)
+    st.caption(" · ".join(f"{k}: {v}" for k, v in breakdown.items()))
+
+    with st.expander("Highlights"):
+        for b in bullets:
+            st.markdown(f"- {b}")
+        st.markdown(f"*{explanation}*")
+
+
+@core.timed("stage.watchlist")
+def render_watchlist_grid(pairs: List[str], per_row: int = 3):
+    st.markdown("### 🧭 Watchlist Overview")
+
+    tiles = {}
+    for start in range(0, len(pairs), per_row):
+        cols = st.columns(per_row)
+        for col, pair in zip(cols, pairs[start:start + per_row]):
+            tiles[pair] = col.empty()
+            tiles[pair].markdown(f"**{pair}**  \n⏳ Analyzing...")
+
+    progress = st.progress(0.0, text=f"0 / {len(pairs)} pairs analyzed")
+    finished = []
+
+    def on_result(pair, result, error):
+        with tiles[pair].container():
+            render_pair_tile(pair, result, error)
+        finished.append(pair)
+        progress.progress(len(finished) / len(pairs), text=f"{len(finished)} / {len(pairs)} pairs analyzed")
+
+    if not core.section("batch").get("enabled", True):
+        core.analyze_pairs_concurrently(pairs, on_result, analyze=analyze_pair)
+        return
+
+    # Prefetched pairs render straight away; the rest share batched requests
+    remaining = []
+    for pair in pairs:
+        prefetched, _ = get_scheduler().get(f"pair:{pair}")
+        if prefetched is not None:
+            on_result(pair, prefetched, None)
+        else:
+            remaining.append(pair)
+    # Headlines load on worker threads, straight from core, so a failed fetch is that pair's error
+    core.analyze_pairs_batched(remaining, on_result, load=core.load_currency_headlines)
+
+
+# ── Diagnostics ──────────────────────────────────────────
+def render_diagnostics():
+    metrics = core.get_metrics()
+    rows = [
+        {"stage": r["stage"], "n": r["count"], "p50 ms": round(r["p50"] * 1000, 1),
+         "p95 ms": round(r["p95"] * 1000, 1), "p99 ms": round(r["p99"] * 1000, 1)}
+        for r in metrics.summary_rows("stage_seconds")
+    ]
+    st.sidebar.markdown("**Diagnostics**")
+    if rows:
+        st.sidebar.dataframe(rows, hide_index=True, use_container_width=True)
+
+    tokens = {}
+    for r in metrics.counter_rows("llm_tokens_total"):
+        tokens[r["kind"]] = tokens.get(r["kind"], 0) + r["value"]
+    cost = sum(r["value"] for r in metrics.counter_rows("llm_cost_usd_total"))
+    st.sidebar.caption(
+        f"Tokens: {tokens.get('prompt', 0):,.0f} prompt ({tokens.get('cached_prompt', 0):,.0f} cached) · "
+        f"{tokens.get('completion', 0):,.0f} completion · ≈ ${cost:.4f}"
+    )
+    st.sidebar.download_button("Download metrics", core.metrics_text(), file_name="treasurylens.prom", mime="text/plain")
+
+
 # ── Main App ──────────────────────────────────────────────
 def main():
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    st.set_page_config(page_title="TreasuryLens", layout="wide", initial_sidebar_state="expanded")
+    st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
+    core.configure(st.secrets.to_dict())
+
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_memory = core.new_conversation_memory([])
     if "summary_ready" not in st.session_state:
         st.session_state.summary_ready = False
 
     st.title("TreasuryLens")
     st.subheader("Currency Market Insights")
 
+    cache_stats = core.get_analysis_cache().stats()
+    st.sidebar.caption(
+        f"Analysis cache: {cache_stats['entries']} entries · "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})"
+    )
+    flights = core.get_single_flight().stats()
+    if flights:
+        total = sum(v["executed"] + v["coalesced"] for v in flights.values())
+        shared = sum(v["coalesced"] for v in flights.values())
+        detail = ", ".join(f"{name} {v['coalesced']}" for name, v in flights.items() if v["coalesced"])
+        st.sidebar.caption(f"Coalesced calls: {shared} of {total}" + (f" ({detail})" if detail else ""))
+
+    scheduler = get_scheduler()
+
     if st.button("Fetch Global FX Sentiment"):
+        live = st.empty()
         with st.spinner("Fetching and analyzing global news..."):
             try:
-                snippets = fetch_global_headlines()
-                bullets, overall, counts, explanation = analyze_with_gpt(snippets)
+                # Serve the last prefetched result straight away; the scheduler revalidates it
+                prefetched, fetched_at = scheduler.get("global")
+                if prefetched is not None:
+                    snippets = prefetched["snippets"]
+                    bullets, overall, counts, explanation = prefetched["result"]
+                else:
+                    snippets = fetch_global_headlines()
+                    on_point = stream_points_into(live, "Key Takeaways")
+                    bullets, overall, counts, explanation = core.analyze_incremental("global", snippets, on_point)
+                    scheduler.put("global", {"snippets": snippets, "result": (bullets, overall, counts, explanation)})
+                    fetched_at = time.time()
                 st.session_state["summary_data"] = {
                     "snippets": snippets,
                     "bullets": bullets,
                     "overall": overall,
                     "counts": counts,
                     "explanation": explanation,
+                    "fetched_at": fetched_at,
                 }
                 st.session_state.summary_ready = True
-                st.session_state.chat_history = []
+                st.session_state.chat_memory = core.new_conversation_memory(bullets)
             except Exception as e:
                 st.error(f"Could not fetch and analyze global sentiment: {e}")
                 st.session_state.summary_ready = False
+        live.empty()
 
     if st.session_state.summary_ready:
         bullets = st.session_state["summary_data"]["bullets"]
@@ -419,70 +511,99 @@ def main():
         explanation = st.session_state["summary_data"]["explanation"]
 
         render_global_panel(bullets, overall, counts, explanation)
+        render_headline_scores(st.session_state["summary_data"]["snippets"])
+        render_freshness("global", st.session_state["summary_data"]["fetched_at"])
+        render_prompt_stats("global")
 
         st.markdown("#### Ask a follow-up question")
         user_followup = st.text_input("Your question:", key="followup_input")
 
+        memory = st.session_state.chat_memory
         if st.button("Submit Follow-Up"):
             if user_followup.strip():
-                with st.spinner("Thinking..."):
-                    st.session_state.chat_history.append({"role": "user", "content": user_followup})
-
-                    if not any("summary_of_sentiment" in m.get("name", "") for m in st.session_state.chat_history):
-                        summary_context = "\n".join(f"- {pt}" for pt in bullets)
-                        st.session_state.chat_history.insert(0, {
-                            "role": "user",
-                            "content": f"Summary of recent FX sentiment:\n{summary_context}",
-                            "name": "summary_of_sentiment"
-                        })
-
-                    system_msg = {
-                        "role": "system",
-                        "content": "You are a helpful FX market assistant. Be concise, insightful, and use macro/FX terminology when relevant."
-                    }
-
-                    messages = [system_msg] + [
-                        {k: v for k, v in m.items() if k in ["role", "content"]} for m in st.session_state.chat_history
-                    ]
-
-                    try:
-                        response = client.chat.completions.create(
-                            model="gpt-4.1-mini",
-                            messages=messages,
-                            temperature=0.4,
-                        )
-                        reply = response.choices[0].message.content.strip()
-                        st.session_state.chat_history.append({"role": "assistant", "content": reply})
-                    except Exception as e:
-                        st.error(f"Follow-up failed: {e}")
-
-        if st.session_state.chat_history:
+                memory.add("user", user_followup)
+                # Sentiment summary + rolling conversation summary + recent turns only
+                messages = memory.messages(core.CHAT_SYSTEM_PROMPT)
+
+                # Tokens render as they arrive; the finished reply then moves into the history below
+                live = st.empty()
+                try:
+                    with live.container(), core.stage("chat.follow_up"):
+                        st.markdown(f"**You:** {user_followup}")
+                        reply = st.write_stream(core.stream_chat_reply(messages))
+                    memory.add("assistant", reply.strip())
+                except Exception as e:
+                    st.error(f"Follow-up failed: {e}")
+                live.empty()
+
+                # Compact once the reply is on screen, so the next question starts from a bounded prompt
+                if not core.compact_conversation(memory):
+                    st.warning("Earlier messages could not be summarized; the assistant no longer sees them.")
+
+        if memory.turns:
             st.markdown("---")
             st.markdown("#### Conversation History")
-            for msg in st.session_state.chat_history:
+            if memory.window_start:
+                st.caption(f"{memory.window_start} earlier messages are condensed into a summary for the model.")
+            for msg in memory.turns:
                 if msg["role"] == "user":
                     st.markdown(f"**You:** {msg['content']}")
                 elif msg["role"] == "assistant":
                     st.markdown(f"**GPT:** {msg['content']}")
 
         if st.button("Clear Chat History"):
-            st.session_state.chat_history = []
+            memory.clear()
             st.experimental_rerun()
 
     st.markdown("---")
 
-    pair = st.selectbox("Select Currency Pair to Analyze:", ["EUR/USD", "EUR/GBP", "USD/GBP", "EUR/JPY", "EUR/AUD", "EUR/CAD", "EUR/INR", "USD/CNH", "EUR/CHF", "EUR/NOK", "USD/BRL", "USD/ZAR", "USD/MXN", "USD/IDR"])
+    pair = st.selectbox("Select Currency Pair to Analyze:", core.CURRENCY_PAIRS)
     if st.button("Analyze This Pair"):
+        live = st.empty()
         with st.spinner(f"Analyzing sentiment for {pair}..."):
             try:
-                snippets = fetch_currency_headlines(pair)
-                bullets, overall, counts, explanation = analyze_with_gpt(snippets)
+                prefetched, fetched_at = scheduler.get(f"pair:{pair}")
+                if prefetched is not None:
+                    bullets, overall, counts, explanation = prefetched
+                else:
+                    snippets = fetch_currency_headlines(pair)
+                    on_point = stream_points_into(live, "Highlights")
+                    bullets, overall, counts, explanation = core.analyze_incremental(pair, snippets, on_point)
+                    scheduler.put(f"pair:{pair}", (bullets, overall, counts, explanation))
+                    fetched_at = time.time()
+                live.empty()
                 render_currency_panel(bullets, overall, counts, explanation)
+                render_freshness(f"pair:{pair}", fetched_at)
+                render_prompt_stats(pair)
             except Exception as e:
+                live.empty()
                 st.error(f"Could not fetch or analyze {pair}: {e}")
 
-    events = scrape_calendar()
-    render_week_ahead_horizontal(events)
+    st.markdown("---")
+
+    watchlist = st.multiselect("Pairs to analyze together:", core.CURRENCY_PAIRS, default=core.CURRENCY_PAIRS)
+    if st.button("Analyze All Pairs"):
+        if watchlist:
+            render_watchlist_grid(watchlist)
+        else:
+            st.info("Select at least one pair.")
+
+    st.markdown("---")
+    render_sentiment_trend()
+
+    st.sidebar.markdown("**Economic calendar**")
+    days_ahead = st.sidebar.selectbox("Days ahead", [5, 7, 14, 28], index=0)
+    min_importance = st.sidebar.select_slider("Minimum importance", options=[1, 2, 3], value=1)
+    regions = st.sidebar.multiselect("Regions", core.CALENDAR_REGIONS, default=core.CALENDAR_REGIONS)
+
+    calendar = scrape_calendar(days_ahead, min_importance)
+    render_week_ahead_horizontal(calendar, regions)
+    if calendar.fetched_at is not None:
+        render_freshness("calendar", calendar.fetched_at)
+
+    if st.sidebar.checkbox("Show diagnostics", value=core.section("metrics").get("sidebar", False)):
+        render_diagnostics()
+    core.write_metrics_textfile()
 
 if __name__ == "__main__":
     main()
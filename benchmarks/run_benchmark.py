@@ -0,0 +1,247 @@
+# benchmarks/run_benchmark.py
+#
+# Offline end-to-end benchmark: drives app.py headlessly with Streamlit's AppTest
+# against the local stand-ins in stub_servers.py and writes the results as JSON.
+#
+#   python benchmarks/run_benchmark.py --repeat 3 --latency openai=800 --output bench.json
+#   python benchmarks/run_benchmark.py --compare bench.json
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import analysis_cache
+import core
+from stub_servers import StubConfig, StubServers
+
+APP_PATH = os.path.join(ROOT, "app.py")
+PHASES = ["cold", "warm", "restart"]
+
+
+# ── Cache Instrumentation ──────────────────────────────────
+# Counts hits/misses across every AnalysisCache instance the app creates, since
+# core.reset() replaces the instance between phases.
+CACHE_COUNTS = {"hits": 0, "misses": 0}
+_original_get = analysis_cache.AnalysisCache.get
+
+
+def _counting_get(self, key):
+    value = _original_get(self, key)
+    CACHE_COUNTS["hits" if value is not None else "misses"] += 1
+    return value
+
+
+analysis_cache.AnalysisCache.get = _counting_get
+
+
+# ── Scenario ───────────────────────────────────────────────
+def _click(at: AppTest, label: str) -> bool:
+    for button in at.button:
+        if button.label == label:
+            button.click().run()
+            return True
+    return False
+
+
+def _follow_up(at: AppTest) -> bool:
+    inputs = [t for t in at.text_input if t.key == "followup_input"]
+    if not inputs:
+        return False
+    inputs[0].input("How exposed is the yen to a hawkish Fed?")
+    return _click(at, "Submit Follow-Up")
+
+
+STEPS = [
+    ("initial_load", lambda at: at.run() is not None),
+    ("global_sentiment", lambda at: _click(at, "Fetch Global FX Sentiment")),
+    ("follow_up", _follow_up),
+    ("pair_analysis", lambda at: _click(at, "Analyze This Pair")),
+    ("watchlist", lambda at: _click(at, "Analyze All Pairs")),
+    ("idle_rerun", lambda at: at.run() is not None),
+]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_phase(stubs: StubServers, secrets: Dict, timeout: float, trace_memory: bool) -> List[Dict]:
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    for section, values in secrets.items():
+        at.secrets[section] = values
+
+    results = []
+    for name, action in STEPS:
+        calls_before = stubs.snapshot()
+        cache_before = dict(CACHE_COUNTS)
+        if trace_memory:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        ran = action(at)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        calls_after = stubs.snapshot()
+        hits = CACHE_COUNTS["hits"] - cache_before["hits"]
+        misses = CACHE_COUNTS["misses"] - cache_before["misses"]
+        step = {
+            "step": name,
+            "ran": ran,
+            "wall_ms": round(elapsed_ms, 2) if ran else None,
+            "upstream_calls": {k: calls_after.get(k, 0) - calls_before.get(k, 0) for k in ("bing", "tradingeconomics", "openai", "rss", "articles")},
+            "analysis_cache": {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None},
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "exceptions": [str(e.value) for e in at.exception],
+        }
+        if trace_memory:
+            step["python_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        results.append(step)
+    return results
+
+
+def reset_process_caches(cache_path: Optional[str] = None) -> None:
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    core.reset()
+    if cache_path:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(cache_path + suffix):
+                os.remove(cache_path + suffix)
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    summary = {}
+    for phase in PHASES:
+        for step, _ in STEPS:
+            samples = [s["wall_ms"] for run in runs for s in run[phase] if s["step"] == step and s["wall_ms"] is not None]
+            if samples:
+                summary.setdefault(phase, {})[step] = {
+                    "median_ms": round(statistics.median(samples), 2),
+                    "min_ms": round(min(samples), 2),
+                    "max_ms": round(max(samples), 2),
+                }
+    return summary
+
+
+def compare(current: Dict, previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)["summary"]
+    print(f"\n{'phase':<8} {'step':<18} {'before':>10} {'after':>10} {'change':>8}")
+    for phase, steps in current.items():
+        for step, stats in steps.items():
+            before = previous.get(phase, {}).get(step, {}).get("median_ms")
+            after = stats["median_ms"]
+            change = f"{(after - before) / before:+.0%}" if before else "n/a"
+            print(f"{phase:<8} {step:<18} {before if before is not None else '-':>10} {after:>10} {change:>8}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def parse_latency(values: List[str]) -> Dict[str, float]:
+    latency = {}
+    for item in values:
+        name, _, ms = item.partition("=")
+        latency[name.strip()] = float(ms)
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for TreasuryLens.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", nargs="*", default=["bing=150", "tradingeconomics=100", "openai=600", "rss=80", "articles=120"],
+                        help="Per-upstream latency in ms, e.g. openai=800")
+    parser.add_argument("--headlines", type=int, default=30)
+    parser.add_argument("--description-words", type=int, default=40)
+    parser.add_argument("--events-per-day", type=int, default=8)
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of analysis responses served malformed")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest per-run timeout in seconds")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report tracemalloc peaks (slows the run)")
+    parser.add_argument("--output", default=os.path.join(HERE, "results", f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"))
+    parser.add_argument("--compare", help="Earlier results file to diff medians against")
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=parse_latency(args.latency), headlines=args.headlines,
+                        description_words=args.description_words, events_per_day=args.events_per_day,
+                        malformed=args.malformed)
+    stubs = StubServers(config).start()
+    workdir = tempfile.mkdtemp(prefix="treasurylens-bench-")
+    cache_path = os.path.join(workdir, "analysis.sqlite")
+
+    secrets = stubs.secrets()
+    secrets["cache"] = {"path": cache_path}
+    # Background refreshes would race the measured steps
+    secrets["prefetch"] = {"enabled": False}
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    runs = []
+    try:
+        for i in range(args.repeat):
+            run = {}
+            reset_process_caches(cache_path)
+            run["cold"] = run_phase(stubs, secrets, args.timeout, args.trace_memory)
+            # Same process, new session: in-memory caches are warm
+            run["warm"] = run_phase(stubs, secrets, args.timeout, args.trace_memory)
+            # Simulated restart: in-memory caches dropped, disk cache kept
+            reset_process_caches()
+            run["restart"] = run_phase(stubs, secrets, args.timeout, args.trace_memory)
+            runs.append(run)
+            print(f"repeat {i + 1}/{args.repeat} done", file=sys.stderr)
+    finally:
+        stubs.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "config": {
+                "repeat": args.repeat,
+                "latency_ms": config.latency_ms,
+                "headlines": config.headlines,
+                "description_words": config.description_words,
+                "events_per_day": config.events_per_day,
+            },
+        },
+        "summary": summarize(runs),
+        "runs": runs,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["summary"], indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        compare(report["summary"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
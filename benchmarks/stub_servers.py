@@ -0,0 +1,295 @@
+# benchmarks/stub_servers.py
+#
+# Local stand-ins for the Bing News, TradingEconomics calendar and OpenAI chat
+# completion endpoints, with configurable latency and payload sizes.
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+WORDS = (
+    "dollar euro yen sterling yuan franc rupee peso rand inflation rates yields fed ecb boj boe "
+    "hawkish dovish payrolls cpi gdp tariffs rally slump risk haven traders outlook policy"
+).split()
+
+REGIONS = ["United States", "Euro Area", "United Kingdom", "Japan", "China"]
+CATEGORIES = ["CPI", "Interest Rate Decision", "Non Farm Payrolls", "GDP Growth Rate", "PMI", "Retail Sales"]
+
+
+class StubConfig:
+    def __init__(self, latency_ms: Optional[Dict[str, float]] = None, headlines: int = 30,
+                 description_words: int = 40, events_per_day: int = 8, seed: int = 7, malformed: float = 0.0):
+        self.latency_ms = {"bing": 0.0, "tradingeconomics": 0.0, "openai": 0.0, "rss": 0.0, "articles": 0.0}
+        self.latency_ms.update(latency_ms or {})
+        self.headlines = headlines
+        self.description_words = description_words
+        self.events_per_day = events_per_day
+        self.seed = seed
+        # Publish times count back from here, so the same headline keeps the same date across requests
+        self.published_base = datetime.utcnow().replace(second=0, microsecond=0)
+        # Share of analysis responses served fenced, as a Python dict or cut short
+        self.malformed = malformed
+
+
+# ── Canned Payloads ────────────────────────────────────────
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def bing_payload(config: StubConfig, query: str, count: int) -> Dict:
+    rng = random.Random(f"{config.seed}:{query}")
+    return {"value": [
+        {
+            "name": _sentence(rng, 8),
+            "description": _sentence(rng, config.description_words),
+            "provider": [{"name": rng.choice(["Reuters", "Bloomberg", "FXStreet", "CNBC", "WSJ"])}],
+            "datePublished": (config.published_base - timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%S.0000000Z"),
+        }
+        for i in range(min(count, config.headlines))
+    ]}
+
+
+def calendar_payload(config: StubConfig, start: str, end: str) -> list:
+    rng = random.Random(f"{config.seed}:{start}:{end}")
+    day = datetime.strptime(start, "%Y-%m-%d")
+    last = datetime.strptime(end, "%Y-%m-%d")
+    events = []
+    while day <= last:
+        for i in range(config.events_per_day):
+            events.append({
+                "CalendarId": f"{day:%Y%m%d}{i:03d}",
+                "Date": (day + timedelta(hours=8 + i)).strftime("%Y-%m-%dT%H:%M:%S"),
+                "Country": rng.choice(REGIONS),
+                "Category": rng.choice(CATEGORIES),
+                "Importance": rng.randint(1, 3),
+            })
+        day += timedelta(days=1)
+    return events
+
+
+def analysis_payload(rng: random.Random) -> Dict:
+    return {
+        "summary_points": [f"**{_sentence(rng, 6)}** {_sentence(rng, 30)}." for _ in range(5)],
+        "overall_sentiment": rng.choice(["Positive", "Trending Positive", "Neutral", "Trending Negative", "Negative"]),
+        "sentiment_explainer": _sentence(rng, 40) + ".",
+    }
+
+
+def analysis_content(rng: random.Random) -> str:
+    return json.dumps(analysis_payload(rng))
+
+
+def batch_analysis_content(rng: random.Random, prompt: str) -> str:
+    pairs = re.findall(r"^### (\S+)$", prompt, flags=re.MULTILINE)
+    return json.dumps({pair: analysis_payload(rng) for pair in pairs})
+
+
+def missing_fields_content(rng: random.Random, prompt: str) -> str:
+    payload = analysis_payload(rng)
+    wanted = re.findall(r'^- "(\w+)":', prompt, flags=re.MULTILINE)
+    return json.dumps({field: payload[field] for field in wanted if field in payload})
+
+
+def malform(rng: random.Random, content: str) -> str:
+    # The shapes real completions come back in: fenced with prose around, a Python
+    # dict literal, or stopped short inside the explainer
+    shape = rng.choice(["fenced", "python", "truncated"])
+    if shape == "fenced":
+        return f"Here is the analysis:\n```json\n{content}\n```\nLet me know if you need more detail."
+    if shape == "python":
+        return repr(json.loads(content))
+    return content[:content.rfind("sentiment_explainer") + 40]
+
+
+FEEDS = ["central-bank", "fx-news"]
+
+
+def rss_payload(config: StubConfig, base_url: str, name: str) -> str:
+    rng = random.Random(f"{config.seed}:{name}")
+    now = config.published_base
+    items = "".join(
+        f"<item><title>{_sentence(rng, 8)}</title><link>{base_url}/articles/{name}-{i}</link>"
+        f"<description>{_sentence(rng, 20)}</description>"
+        f"<pubDate>{(now - timedelta(hours=i)):%a, %d %b %Y %H:%M:%S} GMT</pubDate></item>"
+        for i in range(10)
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Stub {name}</title>'
+            f"<link>{base_url}</link><description>stub</description>{items}</channel></rss>")
+
+
+def article_payload(config: StubConfig, path: str) -> str:
+    rng = random.Random(f"{config.seed}:{path}")
+    paragraphs = "".join(f"<p>{_sentence(rng, config.description_words)}.</p>" for _ in range(4))
+    return f"<html><head><script>var x = 1;</script></head><body><nav>Home</nav><article>{paragraphs}</article></body></html>"
+
+
+# ── Server ─────────────────────────────────────────────────
+class StubServers:
+    """Serves all three upstreams from one local port and counts the calls each receives."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def secrets(self) -> Dict[str, Dict[str, str]]:
+        return {
+            "bing": {"api_key": "stub", "endpoint": f"{self.base_url}/bing/v7.0/news/search"},
+            "tradingeconomics": {"api_key": "stub", "endpoint": f"{self.base_url}/te/calendar"},
+            "openai": {"api_key": "stub", "base_url": f"{self.base_url}/openai/v1"},
+            "feeds": {"urls": [f"{self.base_url}/rss/{name}" for name in FEEDS]},
+        }
+
+    def start(self) -> "StubServers":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+
+    def _handler(self):
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status: int = 200):
+                self._send(json.dumps(payload), "application/json", status)
+
+            def _send(self, text: str, content_type: str, status: int = 200, headers: Optional[Dict[str, str]] = None):
+                body = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _delay(self, upstream: str):
+                time.sleep(stubs.config.latency_ms.get(upstream, 0.0) / 1000)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.startswith("/bing/"):
+                    stubs._count("bing")
+                    self._delay("bing")
+                    self._send_json(bing_payload(stubs.config, query.get("q", ""), int(query.get("count", 10))))
+                elif url.path.startswith("/te/"):
+                    stubs._count("tradingeconomics")
+                    self._delay("tradingeconomics")
+                    today = datetime.today().strftime("%Y-%m-%d")
+                    self._send_json(calendar_payload(stubs.config, query.get("start_date", today), query.get("end_date", today)))
+                elif url.path.startswith("/rss/"):
+                    stubs._count("rss")
+                    name = url.path.rsplit("/", 1)[-1]
+                    # Feeds never change, so a revalidation is always a bodiless 304
+                    etag = f'"{name}-{stubs.config.seed}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self._delay("rss")
+                    self._send(rss_payload(stubs.config, stubs.base_url, name), "application/rss+xml", headers={"ETag": etag})
+                elif url.path.startswith("/articles/"):
+                    stubs._count("articles")
+                    self._delay("articles")
+                    self._send(article_payload(stubs.config, url.path), "text/html; charset=utf-8")
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                stubs._count("openai")
+                self._delay("openai")
+
+                messages = body.get("messages", [])
+                prompt = "".join(m.get("content", "") for m in messages)
+                rng = random.Random(f"{stubs.config.seed}:{len(prompt)}")
+                if "FX market assistant" in prompt or "Conversation so far" in prompt:
+                    content = _sentence(rng, 60) + "."
+                elif "Provide only the missing fields" in prompt:
+                    content = missing_fields_content(rng, prompt)
+                else:
+                    if "Here are the headline sets:" in prompt:
+                        content = batch_analysis_content(rng, prompt)
+                    else:
+                        content = analysis_content(rng)
+                    if rng.random() < stubs.config.malformed:
+                        content = malform(rng, content)
+                usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                         "total_tokens": (len(prompt) + len(content)) // 4}
+
+                if body.get("stream"):
+                    include_usage = (body.get("stream_options") or {}).get("include_usage")
+                    self._stream(body.get("model", "stub"), content, usage if include_usage else None)
+                    return
+                self._send_json({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _stream(self, model: str, content: str, usage: Optional[Dict] = None):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+                for i, piece in enumerate(pieces + [None]):
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": piece} if piece is not None else {},
+                            "finish_reason": None if piece is not None else "stop",
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                if usage is not None:
+                    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [], "usage": usage}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
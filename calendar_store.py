@@ -0,0 +1,206 @@
+# calendar_store.py
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from analysis_cache import DEFAULT_CACHE_PATH
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def day_range(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def contiguous_ranges(days: Iterable[date]) -> List[Tuple[date, date]]:
+    # [Mon, Tue, Thu] -> [(Mon, Tue), (Thu, Thu)]: one upstream request per run of days
+    ranges: List[Tuple[date, date]] = []
+    for d in sorted(days):
+        if ranges and d - ranges[-1][1] == timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], d)
+        else:
+            ranges.append((d, d))
+    return ranges
+
+
+# ── Pre-Indexed Window ─────────────────────────────────────
+class CalendarIndex:
+    """Events of one date window, grouped once so each grid cell is a dict lookup."""
+
+    def __init__(self, start: date, end: date, events: List[Dict], fetched_at: Optional[float]):
+        self.start = start
+        self.end = end
+        self.events = events
+        # Oldest fetch among the window's days; None when nothing is held yet
+        self.fetched_at = fetched_at
+        self.regions = sorted({ev["region"] for ev in events})
+        self.by_day: Dict[str, List[Dict]] = {}
+        self.by_weekday: Dict[str, List[Dict]] = {}
+        self.by_weekday_region: Dict[Tuple[str, str], List[Dict]] = {}
+        for ev in events:
+            self.by_day.setdefault(ev["date"], []).append(ev)
+            self.by_weekday.setdefault(ev["weekday"], []).append(ev)
+            self.by_weekday_region.setdefault((ev["weekday"], ev["region"]), []).append(ev)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def cell(self, weekday: str, regions: Optional[Sequence[str]] = None) -> List[Dict]:
+        # regions=None means all of them
+        if regions is None or set(regions) >= set(self.regions):
+            return self.by_weekday.get(weekday, [])
+        if not regions:
+            return []
+        if len(regions) == 1:
+            return self.by_weekday_region.get((weekday, regions[0]), [])
+        merged = [ev for r in regions for ev in self.by_weekday_region.get((weekday, r), [])]
+        return sorted(merged, key=lambda ev: (ev["date"], ev["time"]))
+
+
+# ── Date-Keyed Store ───────────────────────────────────────
+class CalendarStore:
+    """SQLite store of economic calendar events keyed by (date, region, event id).
+
+    Remembers when each day was last fetched, so callers only request days that are
+    missing or past their TTL. Days before today change rarely and get the longer
+    past_ttl_seconds. A failed fetch holds its days back for retry_after_seconds, so
+    an upstream outage is not retried on every call. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 3600,
+                 past_ttl_seconds: float = 7 * 24 * 3600, retention_days: int = 90,
+                 retry_after_seconds: float = 300):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.past_ttl_seconds = past_ttl_seconds
+        self.retention_days = retention_days
+        self.retry_after_seconds = retry_after_seconds
+        self._lock = threading.Lock()
+        self._windows: Dict[Tuple[date, date, int], CalendarIndex] = {}
+        # day -> time before which it is not requested again; in memory only
+        self._retry_at: Dict[date, float] = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS calendar_events (
+                date TEXT NOT NULL,
+                region TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                time TEXT NOT NULL,
+                weekday TEXT NOT NULL,
+                event TEXT NOT NULL,
+                importance INTEGER NOT NULL,
+                PRIMARY KEY (date, region, event_id)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS calendar_days (
+                date TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def stale_days(self, start: date, end: date, now: Optional[float] = None) -> List[date]:
+        now = time.time() if now is None else now
+        today = datetime.fromtimestamp(now).date()
+        with self._lock:
+            fetched = dict(self._conn.execute(
+                "SELECT date, fetched_at FROM calendar_days WHERE date BETWEEN ? AND ?",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall())
+
+            retry_at = dict(self._retry_at)
+
+        stale = []
+        for d in day_range(start, end):
+            if retry_at.get(d, 0) > now:
+                continue
+            fetched_at = fetched.get(d.isoformat())
+            ttl = self.past_ttl_seconds if d < today else self.ttl_seconds
+            if fetched_at is None or now - fetched_at >= ttl:
+                stale.append(d)
+        return stale
+
+    def mark_failed(self, start: date, end: date, now: Optional[float] = None) -> None:
+        # Whatever is held for these days keeps being served until the backoff runs out
+        retry_at = (time.time() if now is None else now) + self.retry_after_seconds
+        with self._lock:
+            for d in day_range(start, end):
+                self._retry_at[d] = retry_at
+
+    def put(self, start: date, end: date, events: List[Dict], now: Optional[float] = None) -> None:
+        # Replaces everything held for [start, end]; days without events are recorded as fetched too
+        now = time.time() if now is None else now
+        lo, hi = start.isoformat(), end.isoformat()
+        rows = [
+            (ev["date"], ev["region"], ev["id"], ev["time"], ev["weekday"], ev["event"], ev["importance"])
+            for ev in events if lo <= ev["date"] <= hi
+        ]
+        cutoff = (datetime.fromtimestamp(now).date() - timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM calendar_events WHERE date BETWEEN ? AND ?", (lo, hi))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO calendar_events (date, region, event_id, time, weekday, event, importance) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO calendar_days (date, fetched_at) VALUES (?, ?)",
+                    [(d.isoformat(), now) for d in day_range(start, end)],
+                )
+                self._conn.execute("DELETE FROM calendar_events WHERE date < ?", (cutoff,))
+                self._conn.execute("DELETE FROM calendar_days WHERE date < ?", (cutoff,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._windows.clear()
+            for d in day_range(start, end):
+                self._retry_at.pop(d, None)
+
+    def window(self, start: date, end: date, min_importance: int = 1) -> CalendarIndex:
+        # Built once per window and reused until the next put()
+        key = (start, end, min_importance)
+        with self._lock:
+            index = self._windows.get(key)
+            if index is not None:
+                return index
+
+            lo, hi = start.isoformat(), end.isoformat()
+            rows = self._conn.execute(
+                "SELECT date, region, event_id, time, weekday, event, importance FROM calendar_events "
+                "WHERE date BETWEEN ? AND ? AND importance >= ? ORDER BY date, time, region",
+                (lo, hi, min_importance),
+            ).fetchall()
+            fetched = self._conn.execute(
+                "SELECT COUNT(*), MIN(fetched_at) FROM calendar_days WHERE date BETWEEN ? AND ?", (lo, hi)
+            ).fetchone()
+
+            events = [
+                {"date": r[0], "region": r[1], "id": r[2], "time": r[3], "weekday": r[4], "event": r[5], "importance": r[6]}
+                for r in rows
+            ]
+            index = CalendarIndex(start, end, events, fetched[1] if fetched[0] else None)
+            self._windows[key] = index
+            return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM calendar_events")
+            self._conn.execute("DELETE FROM calendar_days")
+            self._windows.clear()
+            self._retry_at.clear()
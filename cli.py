@@ -0,0 +1,115 @@
+# cli.py
+#
+# Batch entry point: runs the global analysis plus every currency pair without
+# Streamlit and writes the results as JSON or CSV, e.g. from cron:
+#
+#   python cli.py --format csv --output latest.csv
+#   python cli.py --pairs EUR/USD USD/JPY --no-global
+#
+# Keys come from .streamlit/secrets.toml (or --secrets / TREASURYLENS_SECRETS),
+# falling back to the OPENAI_API_KEY, BING_API_KEY and TRADINGECONOMICS_API_KEY
+# environment variables.
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import core
+
+CSV_FIELDS = ["scope", "overall_sentiment", "positive", "neutral", "negative", "summary_points", "explanation", "error"]
+
+
+def analyze_scope(scope: str) -> core.Analysis:
+    if scope == "global":
+        return core.analyze_global()["result"]
+    return core.analyze_pair(scope)
+
+
+def run(scopes: List[str], workers: int, timeout: float, batch: bool = False) -> List[Dict[str, Any]]:
+    rows: Dict[str, Dict[str, Any]] = {}
+
+    def on_result(scope, result, error):
+        row = {"scope": scope, "error": error}
+        if result is not None:
+            bullets, tone, counts, explanation = result
+            row.update({"overall_sentiment": tone, "counts": counts, "summary_points": bullets, "explanation": explanation})
+        rows[scope] = row
+        print(f"{scope}: {error or tone}", file=sys.stderr)
+
+    if batch:
+        pairs = [s for s in scopes if s != "global"]
+        core.analyze_pairs_concurrently([s for s in scopes if s == "global"], on_result, analyze=analyze_scope,
+                                        max_workers=workers, timeout=timeout)
+        core.analyze_pairs_batched(pairs, on_result, max_workers=workers, timeout=timeout)
+    else:
+        core.analyze_pairs_concurrently(scopes, on_result, analyze=analyze_scope, max_workers=workers, timeout=timeout)
+    return [rows[s] for s in scopes]
+
+
+def write_json(rows: List[Dict[str, Any]], out) -> None:
+    json.dump({
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "model": core.GPT_MODEL,
+        "prompt_version": core.PROMPT_VERSION,
+        "results": rows,
+    }, out, indent=2, ensure_ascii=False)
+    out.write("\n")
+
+
+def write_csv(rows: List[Dict[str, Any]], out) -> None:
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        counts = row.get("counts") or {}
+        writer.writerow({
+            "scope": row["scope"],
+            "overall_sentiment": row.get("overall_sentiment", ""),
+            "positive": counts.get("positive", ""),
+            "neutral": counts.get("neutral", ""),
+            "negative": counts.get("negative", ""),
+            "summary_points": " | ".join(row.get("summary_points") or []),
+            "explanation": row.get("explanation", ""),
+            "error": row.get("error") or "",
+        })
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run TreasuryLens FX sentiment analysis in batch.")
+    parser.add_argument("--pairs", nargs="*", default=core.CURRENCY_PAIRS, help="Pairs to analyze (default: all)")
+    parser.add_argument("--no-global", action="store_true", help="Skip the global FX sentiment")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=core.MAX_PAIR_WORKERS)
+    parser.add_argument("--timeout", type=float, default=core.PAIR_TIMEOUT_SECONDS, help="Per-scope timeout in seconds")
+    parser.add_argument("--batch", action="store_true", help="Analyze several pairs per model request")
+    parser.add_argument("--secrets", help="Path to a secrets.toml")
+    parser.add_argument("--metrics", help="Write Prometheus-format stage timings and token usage to this file")
+    args = parser.parse_args(argv)
+
+    if args.secrets:
+        core.configure(core.load_secrets_file(args.secrets))
+
+    # No scheduler here, so poll the feeds once up front; headline fetches read that snapshot
+    core.poll_feeds()
+
+    scopes = ([] if args.no_global else ["global"]) + list(args.pairs)
+    rows = run(scopes, args.workers, args.timeout, args.batch)
+
+    write = write_csv if args.format == "csv" else write_json
+    if args.output == "-":
+        write(rows, sys.stdout)
+    else:
+        with open(args.output, "w", newline="" if args.format == "csv" else None, encoding="utf-8") as f:
+            write(rows, f)
+
+    core.write_metrics_textfile(args.metrics)
+
+    # Non-zero when any scope failed, so cron wrappers notice
+    return 1 if any(row["error"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# conversation_memory.py
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prompt_builder import count_tokens
+
+# summarize(previous_summary, turns, max_tokens) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]], int], str]
+
+
+# ── Follow-Up Chat Memory ──────────────────────────────────
+class ConversationMemory:
+    """Follow-up chat state: the full transcript for display, a recent-turn window
+    that is sent to the model, and a rolling summary of everything older.
+
+    Once the window exceeds window_tokens, compact() moves its oldest turns out and
+    folds them into the summary, so the prompt stays roughly the same size however
+    long the session runs.
+    """
+
+    def __init__(self, context: str = "", window_tokens: int = 1500, summary_tokens: int = 300):
+        self.context = context
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.turns: List[Dict] = []
+        self.window_start = 0
+        self.summary = ""
+        # system + context messages, rebuilt only when the summary changes
+        self._prefix: Optional[Tuple[str, List[Dict[str, str]]]] = None
+
+    def add(self, role: str, content: str) -> None:
+        self.turns.append({"role": role, "content": content, "tokens": count_tokens(content)})
+
+    @property
+    def window(self) -> List[Dict]:
+        return self.turns[self.window_start:]
+
+    def window_size(self) -> int:
+        return sum(t["tokens"] for t in self.window)
+
+    def overflow(self) -> List[Dict]:
+        # Oldest turns that have to leave the window. The latest exchange always stays,
+        # and the window keeps starting on a user turn.
+        window = self.window
+        total = self.window_size()
+        cut = 0
+        while total > self.window_tokens and len(window) - cut > 2:
+            total -= window[cut]["tokens"]
+            cut += 1
+        while cut < len(window) - 2 and window[cut]["role"] != "user":
+            cut += 1
+        return window[:cut]
+
+    def compact(self, summarize: Summarizer) -> bool:
+        old = self.overflow()
+        if not old:
+            return False
+        try:
+            self.summary = summarize(self.summary, [{"role": t["role"], "content": t["content"]} for t in old],
+                                     self.summary_tokens)
+        finally:
+            # The turns leave the window even if summarizing failed, so the prompt stays bounded
+            self.window_start += len(old)
+            self._prefix = None
+        return True
+
+    def messages(self, system: str) -> List[Dict[str, str]]:
+        if self._prefix is None or self._prefix[0] != system:
+            context = self.context
+            if self.summary:
+                context += f"\n\nSummary of the conversation so far:\n{self.summary}"
+            prefix = [{"role": "system", "content": system}]
+            if context:
+                prefix.append({"role": "user", "content": context})
+            self._prefix = (system, prefix)
+        return self._prefix[1] + [{"role": t["role"], "content": t["content"]} for t in self.window]
+
+    def clear(self) -> None:
+        self.turns = []
+        self.window_start = 0
+        self.summary = ""
+        self._prefix = None
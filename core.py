@@ -0,0 +1,1139 @@
+# core.py
+#
+# Headless fetch/analyze pipeline shared by the Streamlit UI (app.py) and the batch
+# CLI (cli.py). Nothing here imports Streamlit, and the heavy dependencies (openai,
+# requests, numpy) are only imported when first used.
+
+import functools
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from analysis_cache import AnalysisCache, DEFAULT_CACHE_PATH, snippet_key
+from calendar_store import CalendarIndex, CalendarStore, contiguous_ranges
+from conversation_memory import ConversationMemory
+from feed_ingest import DEFAULT_FEEDS, FeedIngestor
+from headline_store import HeadlineStore
+from llm_output import (AnalysisFields, SENTIMENT_LABELS, SUMMARY_POINT_COUNT, find_pair, parse_analysis, parse_object,
+                        validate_analysis)
+from metrics import Metrics, write_textfile
+from prompt_builder import CURRENCY_NAMES, PromptBuild, build_prompt, count_tokens, select_snippets, source_tag
+from sentiment_history import SentimentHistory
+from single_flight import SingleFlight
+from stream_parser import SummaryPointStream
+
+logger = logging.getLogger(__name__)
+
+Analysis = Tuple[List[str], str, Dict[str, int], str]
+
+GPT_MODEL = "gpt-4.1-mini"
+# Bump whenever the analysis prompt changes so persisted results are not reused
+PROMPT_VERSION = "analysis-v5"
+
+CURRENCY_PAIRS = ["EUR/USD", "EUR/GBP", "USD/GBP", "EUR/JPY", "EUR/AUD", "EUR/CAD", "EUR/INR", "USD/CNH", "EUR/CHF", "EUR/NOK", "USD/BRL", "USD/ZAR", "USD/MXN", "USD/IDR"]
+
+# Watchlist fan-out: bounded pool, per-pair time limit
+MAX_PAIR_WORKERS = 6
+PAIR_TIMEOUT_SECONDS = 90
+
+DEFAULT_BING_ENDPOINT = "https://api.bing.microsoft.com/v7.0/news/search"
+DEFAULT_CALENDAR_ENDPOINT = "https://api.tradingeconomics.com/calendar"
+# TradingEconomics country names, as they come back in each event's "Country"
+CALENDAR_REGIONS = ["United States", "Euro Area", "United Kingdom", "Japan", "China"]
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class AnalysisError(Exception):
+    pass
+
+
+def empty_result(explanation: str) -> Analysis:
+    return [], "neutral", {"positive": 0, "neutral": 0, "negative": 0}, explanation
+
+
+# ── Settings ───────────────────────────────────────────────
+# Same layout as .streamlit/secrets.toml: [bing], [openai], [tradingeconomics] plus
+# the optional tuning sections ([cache], [http], [prompt], [incremental], ...).
+_settings: Optional[Dict[str, Any]] = None
+_singletons: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+
+def load_secrets_file(path: Optional[str] = None) -> Dict[str, Any]:
+    import tomllib
+
+    candidates = [path] if path else [
+        os.environ.get("TREASURYLENS_SECRETS"),
+        os.path.join(".streamlit", "secrets.toml"),
+        os.path.expanduser(os.path.join("~", ".streamlit", "secrets.toml")),
+    ]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            with open(candidate, "rb") as f:
+                return tomllib.load(f)
+    return {}
+
+
+def configure(settings: Mapping[str, Any]) -> None:
+    # Cheap to call on every Streamlit rerun: clients are only rebuilt when settings change
+    settings = {k: dict(v) if isinstance(v, Mapping) else v for k, v in settings.items()}
+    global _settings
+    with _lock:
+        if settings != _settings:
+            _settings = settings
+            _singletons.clear()
+
+
+def section(name: str) -> Dict[str, Any]:
+    with _lock:
+        if _settings is None:
+            configure(load_secrets_file())
+        return _settings.get(name, {})
+
+
+def api_key(name: str, env_var: str) -> Optional[str]:
+    return section(name).get("api_key") or os.environ.get(env_var)
+
+
+def _singleton(name: str, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        if name not in _singletons:
+            _singletons[name] = factory()
+        return _singletons[name]
+
+
+def get_single_flight() -> SingleFlight:
+    return _singleton("single_flight", SingleFlight)
+
+
+def coalesced(key: Tuple, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # Concurrent identical calls (several sessions, or a session and the prefetcher)
+    # share one in-flight upstream request; see SingleFlight
+    return get_single_flight().do(key, fn, *args, **kwargs)
+
+
+def coalesced_analysis(key: Tuple, fn: Callable[[], Analysis], on_point=None) -> Analysis:
+    # on_point only streams for the caller that actually runs fn; callers that attached
+    # to a run already in flight get the finished points replayed
+    ran = []
+
+    def run():
+        ran.append(True)
+        return fn()
+
+    result = coalesced(key, run)
+    if not ran and on_point is not None:
+        for b in result[0]:
+            on_point(b)
+    return result
+
+
+def reset() -> None:
+    # Drops every process-wide client and cache handle (used by the benchmark's restart phase)
+    with _lock:
+        _singletons.clear()
+
+
+# ── Metrics ────────────────────────────────────────────────
+# Lives for the whole process, independent of configure()/reset()
+_metrics = Metrics()
+_metrics.describe("stage_seconds", "Wall time per stage (rolling window quantiles)")
+_metrics.describe("payload_bytes", "Response payload size per upstream call")
+_metrics.describe("llm_tokens_total", "Model tokens by call and kind")
+_metrics.describe("llm_cost_usd_total", "Estimated model cost in USD")
+_metrics.describe("llm_output_total", "Model outputs by call and how they were parsed")
+_metrics.describe("chat_compactions_total", "Conversation compactions by result")
+
+# USD per million tokens for GPT_MODEL; override under [metrics]
+DEFAULT_PRICES = {"input": 0.40, "cached_input": 0.10, "output": 1.60}
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def stage(name: str):
+    return _metrics.timer(name)
+
+
+def timed(name: str):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _metrics.timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_llm_usage(call: str, usage) -> None:
+    if usage is None:
+        return
+    prompt = usage.prompt_tokens or 0
+    completion = usage.completion_tokens or 0
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+    _metrics.inc("llm_tokens_total", prompt, call=call, kind="prompt")
+    _metrics.inc("llm_tokens_total", cached, call=call, kind="cached_prompt")
+    _metrics.inc("llm_tokens_total", completion, call=call, kind="completion")
+
+    prices = {**DEFAULT_PRICES, **section("metrics").get("prices_per_mtok", {})}
+    cost = ((prompt - cached) * prices["input"] + cached * prices["cached_input"] + completion * prices["output"]) / 1e6
+    _metrics.inc("llm_cost_usd_total", cost, call=call)
+
+
+def metrics_text() -> str:
+    # Counters owned by other components are read at render time
+    extra: Dict[str, Dict] = {}
+    cache = get_analysis_cache().stats()
+    extra["cache_lookups_total"] = {(("cache", "analysis"), ("result", "hit")): cache["hits"],
+                                    (("cache", "analysis"), ("result", "miss")): cache["misses"]}
+    extra["single_flight_calls_total"] = {
+        (("op", name), ("result", result)): v[result]
+        for name, v in get_single_flight().stats().items() for result in ("executed", "coalesced")
+    }
+    extra["http_retries_total"] = {(): get_http().retries}
+    feeds = get_feed_ingestor()
+    if feeds is not None:
+        extra["feed_not_modified_total"] = {(): feeds.not_modified}
+    return _metrics.render(extra)
+
+
+def write_metrics_textfile(path: Optional[str] = None) -> bool:
+    path = path or section("metrics").get("textfile")
+    if not path:
+        return False
+    write_textfile(path, metrics_text())
+    return True
+
+
+# ── Shared Clients ─────────────────────────────────────────
+def get_openai_client():
+    def build():
+        from openai import OpenAI
+
+        # The SDK already pools connections and retries 429/5xx with backoff; bound every call
+        return OpenAI(api_key=api_key("openai", "OPENAI_API_KEY"), base_url=section("openai").get("base_url"),
+                      timeout=60.0, max_retries=3)
+
+    return _singleton("openai", build)
+
+
+def get_http():
+    def build():
+        from http_client import HttpClient
+
+        cfg = section("http")
+        return HttpClient(
+            per_host_limit=cfg.get("per_host_limit", 4),
+            host_limits=cfg.get("host_limits", {}),
+            max_retries=cfg.get("max_retries", 3),
+            timeout=(cfg.get("connect_timeout", 3.05), cfg.get("read_timeout", 10.0)),
+        )
+
+    return _singleton("http", build)
+
+
+def get_analysis_cache() -> AnalysisCache:
+    def build():
+        cfg = section("cache")
+        return AnalysisCache(
+            path=cfg.get("path", DEFAULT_CACHE_PATH),
+            ttl_seconds=cfg.get("ttl_seconds", 6 * 3600),
+            max_entries=cfg.get("max_entries", 2000),
+            max_bytes=cfg.get("max_bytes", 50 * 1024 * 1024),
+        )
+
+    return _singleton("analysis_cache", build)
+
+
+def get_headline_store() -> HeadlineStore:
+    def build():
+        cfg = section("incremental")
+        return HeadlineStore(
+            rebuild_every=cfg.get("rebuild_every", 6),
+            rebuild_after_seconds=cfg.get("rebuild_after_seconds", 6 * 3600),
+        )
+
+    return _singleton("headline_store", build)
+
+
+def get_sentiment_history() -> SentimentHistory:
+    def build():
+        cfg = section("history")
+        return SentimentHistory(path=cfg.get("path", section("cache").get("path", DEFAULT_CACHE_PATH)))
+
+    return _singleton("sentiment_history", build)
+
+
+def record_history(scope: str, result: Analysis) -> None:
+    # Every newly computed analysis that produced insights becomes a point on the
+    # scope's trend; callers skip results served from a cache or the headline store
+    bullets, tone, counts, _ = result
+    if bullets and section("history").get("enabled", True):
+        get_sentiment_history().record(scope, tone, counts, GPT_MODEL, PROMPT_VERSION)
+
+
+# ── Economic Calendar ──────────────────────────────────────
+def get_calendar_store() -> CalendarStore:
+    def build():
+        cfg = section("calendar")
+        return CalendarStore(
+            path=cfg.get("path", section("cache").get("path", DEFAULT_CACHE_PATH)),
+            ttl_seconds=cfg.get("ttl_seconds", 3600),
+            past_ttl_seconds=cfg.get("past_ttl_seconds", 7 * 24 * 3600),
+            retention_days=cfg.get("retention_days", 90),
+            retry_after_seconds=cfg.get("retry_after_seconds", 300),
+        )
+
+    return _singleton("calendar_store", build)
+
+
+def parse_calendar_event(item: Dict) -> Dict:
+    dt = datetime.strptime(item["Date"], "%Y-%m-%dT%H:%M:%S")
+    region = item.get("Country", "Unknown")
+    event = item.get("Category", "Event")
+    return {
+        "id": str(item.get("CalendarId") or f"{item['Date']}|{event}"),
+        "date": dt.strftime("%Y-%m-%d"),
+        "time": dt.strftime("%H:%M"),
+        "weekday": dt.strftime("%a"),
+        "region": region,
+        "event": event,
+        "importance": int(item.get("Importance") or 1),
+    }
+
+
+def fetch_calendar_range(start: date, end: date) -> List[Dict]:
+    cfg = section("tradingeconomics")
+
+    url = cfg.get("endpoint", DEFAULT_CALENDAR_ENDPOINT)
+    params = {
+        "c": api_key("tradingeconomics", "TRADINGECONOMICS_API_KEY"),
+        "country": "united states,eurozone,united kingdom,japan,china",
+        "start_date": start.strftime("%Y-%m-%d"),
+        "end_date": end.strftime("%Y-%m-%d")
+    }
+
+    try:
+        with stage("upstream.tradingeconomics"):
+            r = get_http().get(url, params=params)
+        r.raise_for_status()
+    except Exception as e:
+        raise UpstreamError(f"TradingEconomics API error: {e}") from e
+    _metrics.observe("payload_bytes", len(r.content), stage="upstream.tradingeconomics")
+
+    try:
+        data = r.json()
+    except Exception as e:
+        raise UpstreamError("Received a malformed response (not JSON).") from e
+
+    events = []
+    for item in data:
+        try:
+            events.append(parse_calendar_event(item))
+        except Exception:
+            continue
+
+    return events
+
+
+def load_calendar(days: Optional[int] = None, min_importance: int = 1, fetch: bool = True) -> CalendarIndex:
+    # The window starts at today's date on every call, so it rolls forward by itself.
+    # Only days the store is missing or holds past their TTL are requested upstream;
+    # with fetch=False whatever the store already holds is returned.
+    days = days or section("calendar").get("window_days", 5)
+    start = date.today()
+    end = start + timedelta(days=days - 1)
+
+    store = get_calendar_store()
+    if fetch:
+        coalesced(("calendar", start, end), _refresh_calendar, store, start, end)
+    return store.window(start, end, min_importance)
+
+
+def _refresh_calendar(store: CalendarStore, start: date, end: date) -> None:
+    # A failed range is backed off in the store and the others still refresh;
+    # the first error is raised once they have all been tried
+    error: Optional[UpstreamError] = None
+    for lo, hi in contiguous_ranges(store.stale_days(start, end)):
+        try:
+            store.put(lo, hi, fetch_calendar_range(lo, hi))
+        except UpstreamError as e:
+            store.mark_failed(lo, hi)
+            error = error or e
+    if error is not None:
+        raise error
+
+
+# ── Bing Headlines ─────────────────────────────────────────
+def parse_published(value: Optional[str]) -> Optional[float]:
+    # Bing's datePublished, e.g. "2026-10-17T08:05:00.0000000Z", as a UTC timestamp
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def format_article(a: Dict) -> str:
+    # The trailing [provider, date] tag lets the prompt builder balance sources and rank by recency
+    text = f"{a.get('name','')} — {a.get('description','')}"
+    providers = a.get("provider") or []
+    return text + source_tag(providers[0].get("name") if providers else None, parse_published(a.get("datePublished")))
+
+
+def _bing_search(query: str, count: int) -> List[str]:
+    return coalesced(("bing", query, count), _bing_request, query, count)
+
+
+def _bing_request(query: str, count: int) -> List[str]:
+    params = {"q": query, "count": count, "mkt": "en-US", "safeSearch": "Off"}
+    headers = {"Ocp-Apim-Subscription-Key": api_key("bing", "BING_API_KEY")}
+    with stage("upstream.bing"):
+        r = get_http().get(section("bing").get("endpoint", DEFAULT_BING_ENDPOINT), params=params, headers=headers)
+    r.raise_for_status()
+    _metrics.observe("payload_bytes", len(r.content), stage="upstream.bing")
+    data = r.json().get("value", [])
+    return [format_article(a) for a in data]
+
+
+def load_global_headlines() -> List[str]:
+    try:
+        headlines = _bing_search("forex market news", 30)
+    except Exception as e:
+        raise UpstreamError(f"Error fetching global headlines: {e}") from e
+    return headlines + load_feed_snippets()
+
+
+def load_currency_headlines(pair: str) -> List[str]:
+    try:
+        headlines = _bing_search(f"{pair} forex news", 20)
+    except Exception as e:
+        raise UpstreamError(f"Error fetching headlines for {pair}: {e}") from e
+    pattern = pair_pattern(pair)
+    return headlines + [s for s in load_feed_snippets() if pattern.search(s)]
+
+
+# ── RSS Feeds ──────────────────────────────────────────────
+def get_feed_ingestor() -> Optional[FeedIngestor]:
+    cfg = section("feeds")
+    if not cfg.get("enabled", True):
+        return None
+
+    def build():
+        return FeedIngestor(
+            get_http(),
+            cfg.get("urls", DEFAULT_FEEDS),
+            max_workers=cfg.get("max_workers", 6),
+            poll_interval=cfg.get("poll_interval_seconds", 600),
+            fetch_articles=cfg.get("fetch_articles", True),
+            articles_per_feed=cfg.get("articles_per_feed", 5),
+        )
+
+    return _singleton("feeds", build)
+
+
+def load_feed_snippets() -> List[str]:
+    # The latest polled snapshot, without waiting on a poll; feeds supplement Bing,
+    # so an empty or failing feed never fails the headline fetch
+    ingestor = get_feed_ingestor()
+    if ingestor is None:
+        return []
+    with stage("fetch.feeds"):
+        return ingestor.snippets()
+
+
+def poll_feeds() -> List[str]:
+    ingestor = get_feed_ingestor()
+    if ingestor is None:
+        return []
+    with stage("upstream.feeds"):
+        return ingestor.poll()
+
+
+def pair_pattern(pair: str) -> re.Pattern:
+    names = [n for code in pair.split("/") for n in CURRENCY_NAMES.get(code, [code.lower()])]
+    return re.compile(r"\b(?:" + "|".join(re.escape(n) for n in names) + r")\b", re.IGNORECASE)
+
+
+# ── Analysis Prompt ────────────────────────────────────────
+# Static instruction prefix. It must stay byte-identical between calls so the
+# provider's prompt-prefix cache applies; headlines are appended after it.
+# ANALYSIS_GUIDANCE is shared with the batched prompt, which differs only in its
+# response format.
+ANALYSIS_GUIDANCE = """
+You are a highly experienced Forex trader with over 10 years of expertise in analyzing global currency markets. You’ve traded through rate hike cycles, QE tapers, geopolitical crises, and central bank pivots. Based on the input text (a set of recent news headlines and summaries), your job is to extract exactly FIVE high-impact market insights that are:
+
+1. Highly relevant to currency traders and institutional investors.
+2. Focused on macroeconomic developments, central bank signals, inflation trends, geopolitical risk, or surprise data points that could move FX markets.
+3. Written in a consistent, narrative progression — from macro themes to specific trade implications.
+4. Deeply analytical — avoid vague takeaways like “Fed to pause hikes” or “Euro may rise.” Each insight must include the **cause**, **effect**, and **market implication**.
+
+Use a professional, precise, and insight-rich tone. Your goal is to provide **immediate trading value**.
+
+Each takeaway should follow this structure:
+- **Headline-style summary** (bold)
+- 1-2 sentences of detailed analysis (include *why it matters*, *how it affects specific currencies*, and *what traders should watch next*)
+
+---
+
+**EXAMPLE OUTPUT:**
+
+1. **Dollar faces fresh headwinds as Fed minutes signal a dovish pivot**  
+   The FOMC minutes reveal growing consensus to hold off on further hikes amid cooling labor market data. This could suppress USD demand short-term, especially against yield-seeking pairs like AUD and NZD.
+
+2. **Euro resilience supported by hawkish ECB tones despite growth concerns**  
+   ECB board members maintain a data-dependent but hawkish stance, citing sticky core inflation. EUR/USD may find support unless upcoming PMI data disappoints significantly.
+
+3. **JPY strengthens on safe haven flows amid Middle East tensions**  
+   Renewed geopolitical risk is prompting risk-off sentiment globally, benefitting JPY and CHF. Traders should monitor oil price spikes and U.S. defense positioning for directional cues.
+
+4. **Sterling under pressure as UK wage growth cools sharply**  
+   Slower-than-expected wage data dampens BoE’s tightening outlook. GBP/USD risks breaking below key support if CPI also moderates this week.
+
+5. **Emerging market currencies vulnerable as US 10Y yield rebounds**  
+   A sharp uptick in U.S. long-end yields is reversing recent capital flows to EMs. Currencies like INR, BRL, and ZAR could see renewed selling pressure, especially if U.S. retail sales surprise on the upside.
+
+---
+
+Now, based on the above 5 insights, do the following:
+
+6. Assign an **overall sentiment** from one of the following five options:
+   - Positive
+   - Trending Positive
+   - Neutral
+   - Trending Negative
+   - Negative
+
+7. Provide a 2-3 sentence **explanation** for this sentiment label. Make this grounded in the themes you identified. Don’t be vague — clearly connect it to central bank tone, risk sentiment, data, or market reactions.
+
+"""
+
+ANALYSIS_INSTRUCTIONS = ANALYSIS_GUIDANCE + """---
+
+Respond only with a valid JSON object (double-quoted keys and strings, no code fences or other text) in this format:
+
+{
+  "summary_points": [
+    "Insight 1 (headline + explanation)",
+    "Insight 2 (headline + explanation)",
+    "Insight 3 (headline + explanation)",
+    "Insight 4 (headline + explanation)",
+    "Insight 5 (headline + explanation)"
+  ],
+  "overall_sentiment": "Positive | Trending Positive | Neutral | Trending Negative | Negative",
+  "sentiment_explainer": "This week’s sentiment is [label] because ..."
+}
+
+Here are the latest forex headlines:
+"""
+
+
+def prompt_budget() -> Tuple[int, int]:
+    cfg = section("prompt")
+    return cfg.get("snippet_token_budget", 2500), cfg.get("max_snippet_tokens", 120)
+
+
+def get_prompt_stats() -> Dict[str, PromptBuild]:
+    # Latest prompt size per scope ("global" or a pair), for tuning the budget
+    return _singleton("prompt_stats", dict)
+
+
+def record_prompt_stats(focus: Tuple[str, ...], build: PromptBuild):
+    get_prompt_stats()["/".join(focus) or "global"] = build
+
+
+# ── GPT Completion (blocking or streamed) ─────────────────
+def dedupe_points(on_point):
+    # Passes each summary point to on_point once, so a preview does not repeat points
+    # when a repair follow-up or a fallback rebuild produces them again
+    if on_point is None:
+        return None
+    seen = set()
+
+    def emit(point: str):
+        key = point.strip()
+        if key not in seen:
+            seen.add(key)
+            on_point(point)
+
+    return emit
+
+
+def complete_analysis_prompt(prompt: str, on_point=None, call: str = "analysis") -> str:
+    # With on_point, the completion is streamed and on_point(text) fires for every
+    # summary point as soon as its closing quote arrives. call labels the metrics.
+    client = get_openai_client()
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
+    with stage(f"llm.{call}"):
+        if on_point is None:
+            resp = client.chat.completions.create(model=GPT_MODEL, messages=messages, temperature=0.0)
+            text = resp.choices[0].message.content
+            record_llm_usage(call, resp.usage)
+        else:
+            parser = SummaryPointStream()
+            stream = client.chat.completions.create(model=GPT_MODEL, messages=messages, temperature=0.0, stream=True,
+                                                    stream_options={"include_usage": True})
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    for point in parser.feed(delta):
+                        on_point(point)
+                if getattr(chunk, "usage", None) is not None:
+                    record_llm_usage(call, chunk.usage)
+            text = parser.buffer
+    _metrics.observe("payload_bytes", len(text.encode("utf-8")), stage=f"llm.{call}")
+    return text
+
+
+def stream_chat_reply(messages: List[Dict[str, str]]):
+    stream = get_openai_client().chat.completions.create(model=GPT_MODEL, messages=messages, temperature=0.4, stream=True,
+                                                         stream_options={"include_usage": True})
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+        if getattr(chunk, "usage", None) is not None:
+            record_llm_usage("chat", chunk.usage)
+
+
+# ── Follow-Up Chat ─────────────────────────────────────────
+CHAT_SYSTEM_PROMPT = "You are a helpful FX market assistant. Be concise, insightful, and use macro/FX terminology when relevant."
+
+
+def new_conversation_memory(bullets: List[str]) -> ConversationMemory:
+    cfg = section("chat")
+    summary_context = "\n".join(f"- {pt}" for pt in bullets)
+    return ConversationMemory(
+        f"Summary of recent FX sentiment:\n{summary_context}",
+        window_tokens=cfg.get("window_tokens", 1500),
+        summary_tokens=cfg.get("summary_tokens", 300),
+    )
+
+
+def compact_conversation(memory: ConversationMemory) -> bool:
+    # Folds overflowing turns into the summary. On failure the turns still leave the
+    # window, so the prompt stays bounded, but what they said is lost: that is logged
+    # and counted, and False tells the caller to say so.
+    try:
+        if memory.compact(summarize_conversation):
+            _metrics.inc("chat_compactions_total", result="ok")
+        return True
+    except Exception as e:
+        logger.warning("Conversation compaction failed: %s", e)
+        _metrics.inc("chat_compactions_total", result="failed")
+        return False
+
+
+def summarize_conversation(previous_summary: str, turns: List[Dict[str, str]], max_tokens: int) -> str:
+    # Folds turns leaving the chat window into the rolling summary. Results are cached,
+    # so replaying the same session (or a rerun) never pays for the same summary twice.
+    transcript = "\n".join(f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['content']}" for t in turns)
+    cache = get_analysis_cache()
+    cache_key = snippet_key([], "chat-summary", GPT_MODEL, str(max_tokens), previous_summary, transcript)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = f"""
+Condense this FX follow-up conversation into a running summary of at most {int(max_tokens * 0.75)} words.
+Keep the user's questions, the currencies, levels and data points discussed, and any views or conclusions reached. Drop pleasantries.
+
+Summary so far:
+{previous_summary or "(none)"}
+
+Conversation so far:
+{transcript}
+
+Respond with the updated summary only.
+"""
+    with stage("llm.chat_summary"):
+        resp = get_openai_client().chat.completions.create(
+            model=GPT_MODEL, messages=[{"role": "user", "content": prompt}], temperature=0.0, max_tokens=max_tokens
+        )
+    record_llm_usage("chat_summary", resp.usage)
+    summary = resp.choices[0].message.content.strip()
+    cache.set(cache_key, summary)
+    return summary
+
+
+# ── Output Repair ──────────────────────────────────────────
+FIELD_GUIDANCE = {
+    "summary_points": "exactly FIVE insights, each a bold headline-style summary followed by 1-2 sentences with cause, effect and market implication",
+    "overall_sentiment": "one of " + " | ".join(SENTIMENT_LABELS),
+    "sentiment_explainer": "2-3 sentences grounding the sentiment label in the insights",
+}
+
+
+def request_missing_fields(fields: Dict[str, Any], missing: List[str], headlines: str) -> Dict[str, Any]:
+    # A short follow-up for just the fields a response lacked; the headlines are only
+    # sent again when summary points have to be written. When some points came back,
+    # only the remaining ones are asked for, and they are appended to the others.
+    have = fields.get("summary_points", [])
+    needed = SUMMARY_POINT_COUNT - len(have)
+    guidance = dict(FIELD_GUIDANCE)
+    if have:
+        guidance["summary_points"] = (f"the remaining {needed} of the FIVE insights, in the same format and "
+                                      f"not repeating those above")
+    wanted = "\n".join(f'- "{f}": {guidance[f]}' for f in missing)
+    source = f"\n\nHeadlines:\n{headlines}" if "summary_points" in missing else ""
+    prompt = f"""
+You are a highly experienced Forex trader. Your FX sentiment analysis below is incomplete.
+
+Analysis so far:
+{json.dumps(fields, ensure_ascii=False, indent=2)}{source}
+
+Provide only the missing fields:
+{wanted}
+
+Respond only with a valid JSON object containing just those keys.
+"""
+    text = complete_analysis_prompt(prompt, call="repair")
+    extra = validate_analysis(parse_object(text)).fields
+    extra = {f: extra[f] for f in missing if f in extra}
+    if have and "summary_points" in extra:
+        extra["summary_points"] = have + [p for p in extra["summary_points"] if p not in have][:needed]
+    return extra
+
+
+def resolve_analysis(parsed: AnalysisFields, headlines: str, call: str, on_point=None) -> Dict[str, Any]:
+    # Local repair has already happened in parsing; whatever is still missing costs one
+    # follow-up call instead of a full re-analysis. Raises AnalysisError when nothing usable came back.
+    fields = dict(parsed.fields)
+    outcome = "repaired" if parsed.repaired else "valid"
+    if not fields:
+        _metrics.inc("llm_output_total", call=call, outcome="failed")
+        raise AnalysisError("Could not parse GPT output.")
+    if parsed.missing:
+        extra = request_missing_fields(fields, parsed.missing, headlines)
+        if on_point is not None:
+            for b in extra.get("summary_points", [])[len(fields.get("summary_points", [])):]:
+                on_point(b)
+        fields.update(extra)
+        outcome = "follow_up"
+    if "summary_points" not in fields:
+        _metrics.inc("llm_output_total", call=call, outcome="failed")
+        raise AnalysisError("GPT output had no summary points.")
+    _metrics.inc("llm_output_total", call=call, outcome=outcome)
+    return fields
+
+
+# ── GPT Analysis ───────────────────────────────────────────
+def analysis_key(snippets: List[str], focus: Tuple[str, ...] = ()) -> str:
+    # Shared by single and batched analyses, so either can serve the other's results
+    budget, max_item_tokens = prompt_budget()
+    return snippet_key(snippets, PROMPT_VERSION, GPT_MODEL, *focus, str(budget), str(max_item_tokens))
+
+
+def run_analysis(snippets: List[str], on_point=None, focus: Tuple[str, ...] = ()) -> Analysis:
+    # focus holds the currency codes of the pair being analyzed, used to rank headlines.
+    # Raises AnalysisError when the model call or its output fails.
+    return _run_analysis(snippets, dedupe_points(on_point), focus)[0]
+
+
+def _run_analysis(snippets: List[str], on_point=None, focus: Tuple[str, ...] = ()) -> Tuple[Analysis, bool]:
+    # Also reports whether the result was computed by this call rather than read from the cache
+    if not snippets:
+        return empty_result("No explanation available due to missing data."), False
+
+    budget, max_item_tokens = prompt_budget()
+    cache = get_analysis_cache()
+    cache_key = analysis_key(snippets, focus)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        if on_point is not None:
+            for b in cached["bullets"]:
+                on_point(b)
+        return (cached["bullets"], cached["tone"], cached["counts"], cached["explanation"]), False
+
+    from headline_dedup import collapse_near_duplicates
+    from sentiment_scorer import sentiment_counts
+
+    # Syndicated wire copy shows up several times; send one representative per cluster
+    clusters = collapse_near_duplicates(snippets)
+    build = build_prompt(ANALYSIS_INSTRUCTIONS, clusters, budget, focus, max_item_tokens)
+    record_prompt_stats(focus, build)
+
+    try:
+        text = complete_analysis_prompt(build.prompt, on_point)
+        with stage("parse.analysis"):
+            parsed = parse_analysis(text)
+        result = resolve_analysis(parsed, build.prompt[len(ANALYSIS_INSTRUCTIONS):], "analysis", on_point)
+    except AnalysisError:
+        raise
+    except Exception as e:
+        raise AnalysisError(f"GPT analysis failed: {e}") from e
+
+    bullets = result["summary_points"]
+    tone = result.get("overall_sentiment", "neutral")
+    explanation = result.get("sentiment_explainer", "No explanation provided.")
+    # Counted locally over every fetched headline, including any the prompt budget dropped
+    counts = sentiment_counts(snippets)
+
+    # Only successful analyses are persisted
+    cache.set(cache_key, {"bullets": bullets, "tone": tone, "counts": counts, "explanation": explanation})
+
+    return (bullets, tone, counts, explanation), True
+
+
+# ── Incremental GPT Analysis ──────────────────────────────
+def update_analysis_with_gpt(previous: Analysis, new_snippets: List[str], snippets: List[str],
+                             on_point=None, focus: Tuple[str, ...] = ()) -> Analysis:
+    # new_snippets go to the model; counts are taken over snippets, the full current set,
+    # so headlines that have dropped out of the window stop counting
+    from headline_dedup import collapse_near_duplicates
+    from sentiment_scorer import sentiment_counts
+
+    prev_bullets, prev_tone, _, prev_explanation = previous
+
+    budget, max_item_tokens = prompt_budget()
+    clusters = collapse_near_duplicates(new_snippets)
+    lines, _ = select_snippets(clusters, budget, focus, max_item_tokens)
+    joined = "\n".join(lines)
+    state = json.dumps({
+        "summary_points": prev_bullets,
+        "overall_sentiment": prev_tone,
+        "sentiment_explainer": prev_explanation,
+    }, ensure_ascii=False, indent=2)
+
+    prompt = f"""
+You are a highly experienced Forex trader. Below is your current FX sentiment analysis, built from earlier news headlines, followed by headlines published since then.
+
+Current analysis:
+{state}
+
+New headlines:
+{joined}
+
+Update the analysis so it reflects the new headlines:
+- Keep exactly FIVE summary points in the same format (bold headline-style summary, then 1-2 sentences with cause, effect and market implication). Revise or replace a point only where the new headlines change the picture; keep the others verbatim.
+- Re-assess the overall sentiment (Positive | Trending Positive | Neutral | Trending Negative | Negative) and rewrite the explainer if it no longer holds.
+
+Respond only with a valid JSON object (double-quoted keys and strings, no code fences or other text) in this format:
+
+{{
+  "summary_points": ["...", "...", "...", "...", "..."],
+  "overall_sentiment": "...",
+  "sentiment_explainer": "..."
+}}
+"""
+
+    text = complete_analysis_prompt(prompt, on_point, call="incremental")
+    with stage("parse.incremental"):
+        parsed = parse_analysis(text)
+    if not parsed.fields:
+        _metrics.inc("llm_output_total", call="incremental", outcome="failed")
+        raise AnalysisError("Could not parse GPT output.")
+    # Anything the update left out or garbled carries over from the previous analysis
+    _metrics.inc("llm_output_total", call="incremental", outcome="repaired" if parsed.repaired or parsed.missing else "valid")
+    result = parsed.fields
+
+    # A partial list of points is not worth a follow-up here; the previous five still stand
+    bullets = prev_bullets if "summary_points" in parsed.missing else result["summary_points"]
+    tone = result.get("overall_sentiment", prev_tone)
+    explanation = result.get("sentiment_explainer", prev_explanation)
+    return bullets, tone, sentiment_counts(snippets), explanation
+
+
+def analyze_incremental(scope: str, snippets: List[str], on_point=None) -> Analysis:
+    # Sends only headlines not yet seen for this scope, on top of the previous analysis.
+    # Falls back to a full analysis on first use and whenever a rebuild is due.
+    # on_point streams summary points as they complete (see complete_analysis_prompt).
+    on_point = dedupe_points(on_point)
+
+    def run():
+        result, fresh = _analyze_incremental(scope, snippets, on_point)
+        if fresh:
+            record_history(scope, result)
+        return result
+
+    return coalesced_analysis(("analysis", scope, snippet_key(snippets)), run, on_point)
+
+
+def _analyze_incremental(scope: str, snippets: List[str], on_point=None) -> Tuple[Analysis, bool]:
+    # The flag is True when the model produced this result, False when it was reused
+    store = get_headline_store()
+    new, previous = store.diff(scope, snippets)
+    focus = tuple(scope.split("/")) if "/" in scope else ()
+
+    def full_rebuild():
+        result, fresh = _run_analysis(snippets, on_point, focus)
+        if result[0]:
+            store.record_full(scope, snippets, result)
+        return result, fresh
+
+    if previous is None or store.needs_rebuild(scope, len(new), len(snippets)):
+        return full_rebuild()
+
+    if not new:
+        from sentiment_scorer import sentiment_counts
+
+        if on_point is not None:
+            for b in previous[0]:
+                on_point(b)
+        # Same analysis; the counts still follow the current set, which may have shrunk
+        return (previous[0], previous[1], sentiment_counts(snippets), previous[3]), False
+
+    try:
+        result = update_analysis_with_gpt(previous, new, snippets, on_point, focus)
+    except Exception:
+        # A failed delta is not worth surfacing; the full path still has its own error handling
+        return full_rebuild()
+
+    store.record_incremental(scope, new, result)
+    return result, True
+
+
+def analyze_global() -> Dict[str, Any]:
+    snippets = load_global_headlines()
+    return {"snippets": snippets, "result": analyze_incremental("global", snippets)}
+
+
+def analyze_pair(pair: str) -> Analysis:
+    return analyze_incremental(pair, load_currency_headlines(pair))
+
+
+# ── Batched Multi-Pair Analysis ───────────────────────────
+# Same guidance as ANALYSIS_INSTRUCTIONS, paid for once per request instead of once per pair
+BATCH_INSTRUCTIONS = ANALYSIS_GUIDANCE + """---
+
+You will receive headline sets for several currency pairs, each under its own "### PAIR" heading. Apply everything above to each pair separately, using only that pair's headlines.
+
+Respond only with a valid JSON object (double-quoted keys and strings, no code fences or other text) keyed by each pair exactly as written in its heading:
+
+{
+  "EUR/USD": {
+    "summary_points": ["...", "...", "...", "...", "..."],
+    "overall_sentiment": "Positive | Trending Positive | Neutral | Trending Negative | Negative",
+    "sentiment_explainer": "..."
+  }
+}
+
+Here are the headline sets:
+"""
+
+
+def batch_limits() -> Tuple[int, int]:
+    cfg = section("batch")
+    return cfg.get("max_prompt_tokens", 12000), cfg.get("max_pairs", 6)
+
+
+def plan_batches(section_tokens: Dict[str, int], base_tokens: int,
+                 max_prompt_tokens: int, max_pairs: int) -> List[List[str]]:
+    # First fit in watchlist order; a pair too large to share a request gets one to itself
+    batches: List[List[str]] = []
+    sizes: List[int] = []
+    for pair, tokens in section_tokens.items():
+        for i, batch in enumerate(batches):
+            if len(batch) < max_pairs and sizes[i] + tokens <= max_prompt_tokens:
+                batch.append(pair)
+                sizes[i] += tokens
+                break
+        else:
+            batches.append([pair])
+            sizes.append(base_tokens + tokens)
+    return batches
+
+
+def prepare_batch_analysis(pair_snippets: Dict[str, List[str]]) -> Tuple[Dict[str, Analysis], List[Dict[str, str]]]:
+    # Returns the pairs answerable without a request (cached or no headlines) and the
+    # rest as batches of {pair: prompt section}, each batch within the token limit.
+    from headline_dedup import collapse_near_duplicates
+
+    budget, max_item_tokens = prompt_budget()
+    cache = get_analysis_cache()
+    ready: Dict[str, Analysis] = {}
+    sections: Dict[str, str] = {}
+    for pair, snippets in pair_snippets.items():
+        if not snippets:
+            ready[pair] = empty_result("No explanation available due to missing data.")
+            continue
+        cached = cache.get(analysis_key(snippets, tuple(pair.split("/"))))
+        if cached is not None:
+            ready[pair] = cached["bullets"], cached["tone"], cached["counts"], cached["explanation"]
+            continue
+        lines, _ = select_snippets(collapse_near_duplicates(snippets), budget, tuple(pair.split("/")), max_item_tokens)
+        sections[pair] = f"### {pair}\n" + "\n".join(lines)
+
+    max_prompt_tokens, max_pairs = batch_limits()
+    tokens = {pair: count_tokens(text) + 2 for pair, text in sections.items()}
+    batches = plan_batches(tokens, count_tokens(BATCH_INSTRUCTIONS), max_prompt_tokens, max_pairs)
+    return ready, [{pair: sections[pair] for pair in batch} for batch in batches]
+
+
+def run_analysis_batch(batch: Dict[str, str], pair_snippets: Dict[str, List[str]]) -> Dict[str, Any]:
+    # One request for every pair in the batch. A pair the model leaves out falls back
+    # to its own run_analysis, one with fields missing gets a follow-up for just those;
+    # a single-pair batch, or one whose reply failed outright, goes pair by pair to
+    # run_analysis. A pair whose fallback fails maps to its AnalysisError, so the other
+    # pairs' results still stand.
+    return coalesced(("batch", snippet_key(batch.values())), _run_analysis_batch, batch, pair_snippets)
+
+
+def _analyze_batch_pair(pair: str, snippets: List[str]) -> Any:
+    try:
+        result, fresh = _run_analysis(snippets, focus=tuple(pair.split("/")))
+    except AnalysisError as e:
+        return e
+    if fresh:
+        record_history(pair, result)
+    return result
+
+
+def _run_analysis_batch(batch: Dict[str, str], pair_snippets: Dict[str, List[str]]) -> Dict[str, Any]:
+    from sentiment_scorer import sentiment_counts
+
+    if len(batch) == 1:
+        pair = next(iter(batch))
+        return {pair: _analyze_batch_pair(pair, pair_snippets[pair])}
+
+    prompt = BATCH_INSTRUCTIONS + "\n\n".join(batch.values())
+    try:
+        text = complete_analysis_prompt(prompt, call="batch")
+        with stage("parse.batch"):
+            parsed = parse_object(text)
+    except Exception:
+        parsed = None
+    if parsed is None:
+        # Nothing usable for any pair: each falls back to its own analysis, as a missing pair does
+        _metrics.inc("llm_output_total", call="batch", outcome="failed")
+        return {pair: _analyze_batch_pair(pair, pair_snippets[pair]) for pair in batch}
+
+    cache = get_analysis_cache()
+    results: Dict[str, Any] = {}
+    for pair in batch:
+        item = validate_analysis(find_pair(parsed, pair))
+        try:
+            # A pair with partial output is completed by a follow-up; one missing outright gets its own analysis
+            fields = resolve_analysis(item, batch[pair], "batch") if item.fields else None
+        except Exception:
+            fields = None
+        if fields is None:
+            results[pair] = _analyze_batch_pair(pair, pair_snippets[pair])
+            continue
+        bullets = fields["summary_points"]
+        tone = fields.get("overall_sentiment", "neutral")
+        explanation = fields.get("sentiment_explainer", "No explanation provided.")
+        counts = sentiment_counts(pair_snippets[pair])
+        cache.set(analysis_key(pair_snippets[pair], tuple(pair.split("/"))),
+                  {"bullets": bullets, "tone": tone, "counts": counts, "explanation": explanation})
+        results[pair] = bullets, tone, counts, explanation
+        # Recorded here rather than by callers, so coalesced followers do not add duplicates
+        record_history(pair, results[pair])
+    return results
+
+
+# ── Watchlist: Concurrent Pair Analysis ──────────────
+def analyze_pairs_concurrently(pairs: List[str], on_result, analyze: Callable[[str], Any] = analyze_pair,
+                               max_workers: int = MAX_PAIR_WORKERS, timeout: float = PAIR_TIMEOUT_SECONDS) -> None:
+    # on_result(pair, result, error) is always invoked from the calling thread, in
+    # completion order, so a Streamlit script can render from it.
+    if not pairs:
+        return
+
+    workers = max(1, min(max_workers, len(pairs)))
+    started: Dict[str, float] = {}
+
+    def run(pair: str):
+        started[pair] = time.monotonic()
+        return analyze(pair)
+
+    # Backstop for pairs that never get a worker because earlier ones hang
+    deadline = time.monotonic() + timeout * math.ceil(len(pairs) / workers)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pair-analysis")
+    futures = {pool.submit(run, p): p for p in pairs}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    result, error = fut.result(), None
+                except Exception as e:
+                    result, error = None, str(e)
+                on_result(futures[fut], result, error)
+
+            now = time.monotonic()
+            for fut in list(pending):
+                pair = futures[fut]
+                if now >= deadline or (pair in started and now - started[pair] > timeout):
+                    pending.discard(fut)
+                    fut.cancel()
+                    on_result(pair, None, f"Timed out after {timeout:.0f}s")
+    finally:
+        # Don't wait on stragglers; their results are simply dropped
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def analyze_pairs_batched(pairs: List[str], on_result, load: Callable[[str], List[str]] = load_currency_headlines,
+                          max_workers: int = MAX_PAIR_WORKERS, timeout: float = PAIR_TIMEOUT_SECONDS) -> None:
+    # Same contract as analyze_pairs_concurrently. Headlines are fetched concurrently;
+    # pairs the headline store can update incrementally then run on their own, and
+    # the pairs needing a full analysis share batched requests.
+    if not pairs:
+        return
+
+    snippets: Dict[str, List[str]] = {}
+
+    def on_fetched(pair, result, error):
+        if error:
+            on_result(pair, None, error)
+        else:
+            snippets[pair] = result
+
+    analyze_pairs_concurrently(pairs, on_fetched, analyze=load, max_workers=max_workers, timeout=timeout)
+
+    store = get_headline_store()
+    incremental: List[str] = []
+    full: Dict[str, List[str]] = {}
+    for pair in pairs:
+        if pair not in snippets:
+            continue
+        new, previous = store.diff(pair, snippets[pair])
+        if previous is not None and not store.needs_rebuild(pair, len(new), len(snippets[pair])):
+            incremental.append(pair)
+        else:
+            full[pair] = snippets[pair]
+
+    def finish(pair, result, error):
+        # History is recorded where a result is computed; ready pairs are cache hits
+        if error is None and result[0]:
+            store.record_full(pair, snippets[pair], result)
+        on_result(pair, result, error)
+
+    ready, batches = prepare_batch_analysis(full)
+    for pair, result in ready.items():
+        finish(pair, result, None)
+
+    units = {f"batch:{i}": batch for i, batch in enumerate(batches)}
+
+    def run(unit: str):
+        if unit in units:
+            return run_analysis_batch(units[unit], full)
+        return analyze_incremental(unit, snippets[unit])
+
+    def on_unit(unit, result, error):
+        if unit not in units:
+            on_result(unit, result, error)
+            return
+        for pair in units[unit]:
+            item = result.get(pair) if result else None
+            if isinstance(item, AnalysisError):
+                finish(pair, None, str(item))
+            else:
+                finish(pair, item, error)
+
+    analyze_pairs_concurrently(incremental + list(units), on_unit, analyze=run, max_workers=max_workers, timeout=timeout)
@@ -0,0 +1,168 @@
+# feed_ingest.py
+
+import calendar
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from prompt_builder import source_tag
+
+# Central-bank press releases and FX news; override with [feeds] urls in secrets
+DEFAULT_FEEDS = [
+    "https://www.federalreserve.gov/feeds/press_all.xml",
+    "https://www.ecb.europa.eu/rss/press.html",
+    "https://www.bankofengland.co.uk/rss/news",
+    "https://www.boj.or.jp/en/rss/whatsnew.xml",
+    "https://www.fxstreet.com/rss/news",
+]
+
+
+def html_to_text(html: str, max_chars: int) -> str:
+    # Article body as plain text: paragraph text when the page has any, otherwise all visible text
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "nav", "header", "footer", "aside", "form"]):
+        tag.decompose()
+    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+    text = " ".join(p for p in paragraphs if len(p) > 40) or soup.get_text(" ", strip=True)
+    text = " ".join(text.split())
+    return text[:max_chars].rsplit(" ", 1)[0] + "…" if len(text) > max_chars else text
+
+
+# ── Feed Ingestion ─────────────────────────────────────────
+class FeedIngestor:
+    """Polls RSS/Atom feeds concurrently and turns their entries into headline snippets.
+
+    Feeds are requested with If-None-Match / If-Modified-Since, so an unchanged feed
+    is a 304 with no body and its previous entries are reused. Article pages are only
+    downloaded once per link; their HTML is parsed with bs4 in the same worker pool.
+    poll() blocks and is meant for a scheduler job; snippets() only ever reads.
+    """
+
+    def __init__(self, http, feeds: List[str], max_workers: int = 6, poll_interval: float = 600,
+                 fetch_articles: bool = True, articles_per_feed: int = 5, article_chars: int = 600,
+                 max_items: int = 40, max_cached_articles: int = 500):
+        self.http = http
+        self.feeds = list(feeds)
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.fetch_articles = fetch_articles
+        self.articles_per_feed = articles_per_feed
+        self.article_chars = article_chars
+        self.max_items = max_items
+        self.max_cached_articles = max_cached_articles
+
+        self.last_poll: Optional[float] = None
+        self.errors: Dict[str, str] = {}
+        self.not_modified = 0
+        self._feeds: Dict[str, Dict] = {}
+        self._articles: "OrderedDict[str, str]" = OrderedDict()
+        self._snippets: List[str] = []
+        self._poll_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _fetch_feed(self, url: str) -> List[Dict]:
+        state = self._feeds.get(url, {})
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        r = self.http.get(url, headers=headers)
+        if r.status_code == 304:
+            self.not_modified += 1
+            return state.get("entries", [])
+        r.raise_for_status()
+
+        import feedparser
+
+        parsed = feedparser.parse(r.content)
+        source = parsed.feed.get("title") or url
+        entries = []
+        for e in parsed.entries:
+            published = e.get("published_parsed") or e.get("updated_parsed")
+            entries.append({
+                "title": e.get("title", "").strip(),
+                "link": e.get("link", ""),
+                "summary": e.get("summary", ""),
+                "source": source,
+                "published": calendar.timegm(published) if published else 0.0,
+            })
+        self._feeds[url] = {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "entries": entries,
+        }
+        return entries
+
+    def _fetch_article(self, link: str) -> str:
+        r = self.http.get(link)
+        r.raise_for_status()
+        return html_to_text(r.text, self.article_chars)
+
+    def _snippet(self, entry: Dict) -> str:
+        body = self._articles.get(entry["link"]) or html_to_text(entry["summary"], self.article_chars)
+        return f"{entry['title']} — {body}{source_tag(entry['source'], entry['published'] or None)}"
+
+    def poll(self) -> List[str]:
+        # Concurrent callers share one poll instead of each starting their own
+        if not self._poll_lock.acquire(blocking=False):
+            with self._poll_lock:
+                return self.latest()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="feed-ingest") as pool:
+                feeds = {url: pool.submit(self._fetch_feed, url) for url in self.feeds}
+                entries = []
+                for url, fut in feeds.items():
+                    try:
+                        entries.extend(fut.result()[:self.articles_per_feed])
+                        self.errors.pop(url, None)
+                    except Exception as e:
+                        self.errors[url] = str(e)
+                        entries.extend(self._feeds.get(url, {}).get("entries", [])[:self.articles_per_feed])
+
+                if self.fetch_articles:
+                    links = [e["link"] for e in entries if e["link"] and e["link"] not in self._articles]
+                    articles = {link: pool.submit(self._fetch_article, link) for link in dict.fromkeys(links)}
+                    for link, fut in articles.items():
+                        try:
+                            self._articles[link] = fut.result()
+                        except Exception:
+                            continue
+
+                while len(self._articles) > self.max_cached_articles:
+                    self._articles.popitem(last=False)
+
+                entries.sort(key=lambda e: e["published"], reverse=True)
+                # Summaries are parsed in the pool as well, off the calling thread
+                snippets = list(pool.map(self._snippet, [e for e in entries if e["title"]][:self.max_items]))
+
+            with self._lock:
+                self._snippets = snippets
+                self.last_poll = time.time()
+            return snippets
+        finally:
+            self._poll_lock.release()
+
+    def latest(self) -> List[str]:
+        with self._lock:
+            return list(self._snippets)
+
+    def snippets(self) -> List[str]:
+        # Never polls on the calling thread: returns the last poll's snippets and, when there
+        # is none yet or it is older than poll_interval, starts a poll in the background
+        stale = self.last_poll is None or time.time() - self.last_poll > self.poll_interval
+        if stale and not self._poll_lock.locked():
+            threading.Thread(target=self._poll_quietly, name="feed-poll", daemon=True).start()
+        return self.latest()
+
+    def _poll_quietly(self) -> None:
+        # Per-feed failures are already kept in errors
+        try:
+            self.poll()
+        except Exception:
+            pass
@@ -0,0 +1,74 @@
+# headline_dedup.py
+
+import re
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+from prompt_builder import strip_source
+
+# MinHash parameters: 64 permutations of a universal hash over a 31-bit prime field
+NUM_PERM = 64
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+# ── Shingling ──────────────────────────────────────────────
+def shingles(text: str, k: int = 5) -> List[str]:
+    # Character k-grams over a punctuation-free form tolerate the small rewordings
+    # ("U.S." vs "US", "favour" vs "favor") typical of syndicated wire copy. The
+    # provider tag is dropped, since that is exactly where syndicated copies differ.
+    norm = _NON_WORD_RE.sub(" ", strip_source(text).lower()).strip()
+    if len(norm) <= k:
+        return [norm]
+    return [norm[i:i + k] for i in range(len(norm) - k + 1)]
+
+
+# ── MinHash Signatures ─────────────────────────────────────
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    # All shingle hashes are laid out in one flat array so every permutation is a
+    # single vectorized pass; reduceat then takes the per-document minimum.
+    hashed = [
+        np.unique(np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(t)), dtype=np.uint64))
+        for t in texts
+    ]
+    lengths = np.array([len(h) for h in hashed])
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    flat = np.concatenate(hashed) % _PRIME
+
+    permuted = (_A[:, None] * flat[None, :] + _B[:, None]) % _PRIME
+    return np.minimum.reduceat(permuted, offsets, axis=1).T
+
+
+def similarity_matrix(signatures: np.ndarray) -> np.ndarray:
+    # Fraction of agreeing permutations estimates Jaccard similarity of the shingle sets
+    return (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+
+
+# ── Clustering ─────────────────────────────────────────────
+def collapse_near_duplicates(snippets: List[str], threshold: float = 0.7) -> List[Tuple[str, int]]:
+    """Collapse near-duplicate snippets into (representative, weight) pairs.
+
+    The representative is the earliest member of each cluster, which keeps the source
+    ranking intact; weight is the number of snippets it stands for.
+    """
+    texts = [s for s in snippets if s and s.strip()]
+    if len(texts) < 2:
+        return [(t, 1) for t in texts]
+
+    sim = similarity_matrix(minhash_signatures(texts)) >= threshold
+    assigned = np.zeros(len(texts), dtype=bool)
+    clusters = []
+    for i in range(len(texts)):
+        if assigned[i]:
+            continue
+        members = sim[i] & ~assigned
+        members[i] = True
+        assigned |= members
+        clusters.append((texts[i], int(members.sum())))
+    return clusters
@@ -0,0 +1,77 @@
+# headline_store.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from analysis_cache import normalize_snippet
+
+
+# ── Rolling Headline Store ─────────────────────────────────
+class HeadlineStore:
+    """Per-scope memory of headlines already analyzed and the analysis they produced.
+
+    A scope is "global" or a currency pair. Incremental updates are allowed until
+    either rebuild_every updates have been applied or the last full analysis is older
+    than rebuild_after_seconds, at which point a full rebuild is due to stop drift.
+    """
+
+    def __init__(self, max_headlines: int = 500, rebuild_every: int = 6,
+                 rebuild_after_seconds: float = 6 * 3600, max_new_fraction: float = 0.5):
+        self.max_headlines = max_headlines
+        self.rebuild_every = rebuild_every
+        self.rebuild_after_seconds = rebuild_after_seconds
+        self.max_new_fraction = max_new_fraction
+        self._scopes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def diff(self, scope: str, snippets: List[str]) -> Tuple[List[str], Optional[Any]]:
+        # Returns the headlines not yet seen for this scope and the last analysis (None if there is none)
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                return list(snippets), None
+            new = [s for s in snippets if normalize_snippet(s) not in entry["seen"]]
+            return new, entry["result"]
+
+    def needs_rebuild(self, scope: str, new_count: int, total_count: int) -> bool:
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                return True
+            if entry["updates"] >= self.rebuild_every:
+                return True
+            if time.time() - entry["rebuilt_at"] >= self.rebuild_after_seconds:
+                return True
+        # When most of the set is new, a fresh analysis costs about the same as an update
+        return total_count > 0 and new_count / total_count > self.max_new_fraction
+
+    def record_full(self, scope: str, snippets: List[str], result: Any) -> None:
+        with self._lock:
+            entry = {"seen": OrderedDict(), "result": result, "updates": 0, "rebuilt_at": time.time()}
+            self._scopes[scope] = entry
+            self._remember(entry, snippets)
+
+    def record_incremental(self, scope: str, new_snippets: List[str], result: Any) -> None:
+        with self._lock:
+            entry = self._scopes[scope]
+            entry["result"] = result
+            entry["updates"] += 1
+            self._remember(entry, new_snippets)
+
+    def _remember(self, entry: Dict[str, Any], snippets: List[str]) -> None:
+        seen = entry["seen"]
+        for s in snippets:
+            key = normalize_snippet(s)
+            seen[key] = None
+            seen.move_to_end(key)
+        while len(seen) > self.max_headlines:
+            seen.popitem(last=False)
+
+    def reset(self, scope: Optional[str] = None) -> None:
+        with self._lock:
+            if scope is None:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope, None)
@@ -0,0 +1,105 @@
+# http_client.py
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) in seconds
+DEFAULT_TIMEOUT = (3.05, 10.0)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# ── Pooled HTTP Client ─────────────────────────────────────
+class HttpClient:
+    """One keep-alive session for every upstream call.
+
+    Each host gets a concurrency cap (host_limits overrides per_host_limit). 429/5xx
+    responses and connection errors are retried with full-jitter exponential backoff,
+    honouring Retry-After, and every request carries a strict (connect, read) timeout.
+    """
+
+    def __init__(self, pool_maxsize: int = 20, per_host_limit: int = 4,
+                 host_limits: Optional[Dict[str, int]] = None, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_cap: float = 8.0,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT, queue_timeout: float = 30.0):
+        self.per_host_limit = per_host_limit
+        self.host_limits = dict(host_limits or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.retries = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _slot(self, host: str):
+        with self._lock:
+            sem = self._slots.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.host_limits.get(host, self.per_host_limit))
+                self._slots[host] = sem
+        if not sem.acquire(timeout=self.queue_timeout):
+            raise requests.exceptions.Timeout(f"Timed out waiting for a free connection slot to {host}")
+        try:
+            yield
+        finally:
+            sem.release()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, resp: requests.Response) -> Optional[float]:
+        value = resp.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return max(0.0, min(seconds, self.backoff_cap))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                with self._slot(host):
+                    resp = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUSES or last:
+                    return resp
+                delay = self._retry_after(resp)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                resp.close()
+
+            self.retries += 1
+            # Sleep outside the host slot so a backing-off call doesn't block its neighbours
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
@@ -0,0 +1,221 @@
+# llm_output.py
+
+import ast
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+SENTIMENT_LABELS = ["Positive", "Trending Positive", "Neutral", "Trending Negative", "Negative"]
+ANALYSIS_FIELDS = ("summary_points", "overall_sentiment", "sentiment_explainer")
+# The prompts ask for exactly this many summary points
+SUMMARY_POINT_COUNT = 5
+
+# Keys the model sometimes uses instead of the ones asked for
+FIELD_ALIASES = {
+    "points": "summary_points",
+    "summary": "summary_points",
+    "insights": "summary_points",
+    "takeaways": "summary_points",
+    "sentiment": "overall_sentiment",
+    "overall": "overall_sentiment",
+    "tone": "overall_sentiment",
+    "explainer": "sentiment_explainer",
+    "explanation": "sentiment_explainer",
+    "sentiment_explanation": "sentiment_explainer",
+    "rationale": "sentiment_explainer",
+}
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_JSON_LITERAL_RE = re.compile(r"\b(true|false|null)\b")
+_LIST_MARKER_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+")
+
+
+class AnalysisFields(NamedTuple):
+    fields: Dict[str, Any]
+    missing: List[str]
+    repaired: bool
+
+
+# ── Tolerant Parsing ───────────────────────────────────────
+def strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    return match.group(1).strip() if match else text.strip()
+
+
+def extract_object(text: str) -> Optional[str]:
+    # From the first "{" to its matching "}", skipping prose around it. An unclosed
+    # object (a truncated completion) runs to the end of the text.
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, quote, escaped = 0, "", False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = ""
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def close_truncated(text: str) -> str:
+    # Cut back to the last complete value and close the brackets still open there,
+    # so a completion that stopped mid-sentence keeps everything before that point.
+    stack: List[str] = []
+    quote, escaped, is_key, key_next = "", False, False, False
+    safe, safe_stack = 0, []
+    for i, ch in enumerate(text):
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = ""
+                if not is_key:
+                    safe, safe_stack = i + 1, list(stack)
+            continue
+        if ch in "\"'":
+            quote, is_key = ch, key_next
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            key_next = ch == "{"
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            safe, safe_stack, key_next = i + 1, list(stack), False
+        elif ch == ":":
+            key_next = False
+        elif ch == ",":
+            key_next = bool(stack) and stack[-1] == "}"
+    if not stack and not quote:
+        return text
+    return text[:safe] + "".join(reversed(safe_stack)) if safe else text
+
+
+def _load(text: str) -> Any:
+    # JSON first, then a Python literal (single quotes, trailing commas), then a
+    # literal with JSON's true/false/null spelled the Python way
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    try:
+        return ast.literal_eval(_JSON_LITERAL_RE.sub(lambda m: {"true": "True", "false": "False", "null": "None"}[m.group(1)], text))
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def parse_object(text: str) -> Optional[Dict[str, Any]]:
+    body = extract_object(strip_fences(text or ""))
+    if body is None:
+        return None
+    for candidate in (body, close_truncated(body)):
+        value = _load(candidate)
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+# ── Analysis Schema ────────────────────────────────────────
+def _canonical_key(key: Any) -> str:
+    key = re.sub(r"[\s-]+", "_", str(key).strip().lower())
+    return FIELD_ALIASES.get(key, key)
+
+
+def _points(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = [line for line in value.splitlines() if line.strip()]
+    if not isinstance(value, (list, tuple)):
+        return []
+    points = []
+    for item in value:
+        if isinstance(item, dict):
+            parts = [str(v).strip() for v in item.values() if str(v).strip()]
+            item = f"**{parts[0].strip('*')}** " + " ".join(parts[1:]) if len(parts) > 1 else " ".join(parts)
+        text = _LIST_MARKER_RE.sub("", str(item)).strip() if item is not None else ""
+        if text:
+            points.append(text)
+    return points
+
+
+def sentiment_label(value: Any) -> Optional[str]:
+    # Canonical label, also when it is decorated ("**Trending Negative**") or embedded in a sentence
+    if not isinstance(value, str):
+        return None
+    text = value.strip(" *_.\"'").lower()
+    for label in sorted(SENTIMENT_LABELS, key=len, reverse=True):
+        if text == label.lower():
+            return label
+    for label in sorted(SENTIMENT_LABELS, key=len, reverse=True):
+        if re.search(rf"\b{label.lower()}\b", text):
+            return label
+    return None
+
+
+def validate_analysis(obj: Any, point_count: int = SUMMARY_POINT_COUNT) -> AnalysisFields:
+    # Keeps the fields that are present and well-formed, coercing near misses; the
+    # rest are reported as missing rather than filled with placeholders. Fewer than
+    # point_count summary points are kept but still reported as missing (partial).
+    if not isinstance(obj, dict):
+        return AnalysisFields({}, list(ANALYSIS_FIELDS), False)
+    raw = {}
+    for key, value in obj.items():
+        raw.setdefault(_canonical_key(key), value)
+    repaired = any(k not in obj for k in raw if k in ANALYSIS_FIELDS)
+
+    fields: Dict[str, Any] = {}
+    points = _points(raw.get("summary_points"))
+    if points:
+        fields["summary_points"] = points
+        repaired |= points != raw.get("summary_points")
+    label = sentiment_label(raw.get("overall_sentiment"))
+    if label:
+        fields["overall_sentiment"] = label
+        repaired |= label != raw.get("overall_sentiment")
+    explainer = raw.get("sentiment_explainer")
+    if isinstance(explainer, list):
+        explainer = " ".join(str(e) for e in explainer)
+    if isinstance(explainer, str) and explainer.strip():
+        fields["sentiment_explainer"] = explainer.strip()
+
+    missing = [f for f in ANALYSIS_FIELDS if f not in fields]
+    if 0 < len(points) < point_count:
+        missing.insert(0, "summary_points")
+    return AnalysisFields(fields, missing, repaired)
+
+
+def parse_analysis(text: str) -> AnalysisFields:
+    obj = parse_object(text)
+    result = validate_analysis(obj)
+    try:
+        clean = isinstance(json.loads(text), dict)
+    except ValueError:
+        clean = False
+    return result._replace(repaired=result.repaired or (obj is not None and not clean))
+
+
+def find_pair(obj: Dict[str, Any], pair: str) -> Any:
+    # A batch entry, also when the model wrote the pair as "EURUSD" or "eur/usd"
+    if pair in obj:
+        return obj[pair]
+    wanted = re.sub(r"[^A-Z]", "", pair.upper())
+    for key, value in obj.items():
+        if re.sub(r"[^A-Z]", "", str(key).upper()) == wanted:
+            return value
+    return None
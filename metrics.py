@@ -0,0 +1,145 @@
+# metrics.py
+
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank on an already sorted sample
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+# ── Rolling Summaries ──────────────────────────────────────
+class RollingSummary:
+    """Last `window` observations for percentiles, plus lifetime count and sum."""
+
+    def __init__(self, window: int = 1024):
+        self.values: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.values)
+        return {q: quantile(ordered, q) for q in QUANTILES}
+
+
+class Metrics:
+    """In-process registry of rolling summaries (timings, sizes) and counters (tokens,
+    cost, cache lookups), rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix: str = "treasurylens", window: int = 1024):
+        self.prefix = prefix
+        self.window = window
+        self._summaries: Dict[str, Dict[Labels, RollingSummary]] = defaultdict(dict)
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._summaries[name].get(key)
+            if series is None:
+                series = self._summaries[name][key] = RollingSummary(self.window)
+            series.observe(value)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        with self._lock:
+            self._counters[name][_labels(labels)] += value
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def summary_rows(self, name: str) -> List[Dict]:
+        # One row per label set, for display
+        with self._lock:
+            items = [(dict(k), s.count, s.total, s.quantiles()) for k, s in self._summaries.get(name, {}).items()]
+        return [{**labels, "count": count, "sum": total, **{f"p{int(q * 100)}": v for q, v in qs.items()}}
+                for labels, count, total, qs in sorted(items, key=lambda r: sorted(r[0].items()))]
+
+    def counter_rows(self, name: str) -> List[Dict]:
+        with self._lock:
+            items = [(dict(k), v) for k, v in self._counters.get(name, {}).items()]
+        return [{**labels, "value": v} for labels, v in sorted(items, key=lambda r: sorted(r[0].items()))]
+
+    def render(self, extra_counters: Optional[Dict[str, Dict[Labels, float]]] = None) -> str:
+        # extra_counters are point-in-time values owned elsewhere (cache stats, retries)
+        lines = []
+        with self._lock:
+            summaries = {n: {k: (s.count, s.total, s.quantiles()) for k, s in series.items()}
+                         for n, series in self._summaries.items()}
+            counters = {n: dict(series) for n, series in self._counters.items()}
+        for name, series in (extra_counters or {}).items():
+            counters.setdefault(name, {}).update(series)
+
+        for name in sorted(summaries):
+            full = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} summary")
+            for key, (count, total, qs) in sorted(summaries[name].items()):
+                for q, v in qs.items():
+                    lines.append(f"{full}{_format_labels(key + (('quantile', str(q)),))} {v:.6g}")
+                lines.append(f"{full}_sum{_format_labels(key)} {total:.6g}")
+                lines.append(f"{full}_count{_format_labels(key)} {count}")
+        for name in sorted(counters):
+            full = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for key, v in sorted(counters[name].items()):
+                lines.append(f"{full}{_format_labels(key)} {v:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+
+
+def write_textfile(path: str, text: str) -> None:
+    # Atomic replace, as the node_exporter textfile collector expects
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,135 @@
+# prefetch_scheduler.py
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ── Background Prefetch Scheduler ──────────────────────────
+class PrefetchScheduler:
+    """Refreshes registered jobs on a cadence and serves their last good result.
+
+    get() never blocks on a refresh: it returns whatever was last stored (possibly
+    stale) and, if the value is past its interval, kicks off a background refresh
+    (stale-while-revalidate). A result only replaces the stored one when is_good
+    accepts it, so a failed upstream call never blanks out a working panel.
+    """
+
+    def __init__(self, max_workers: int = 4, tick_seconds: float = 1.0):
+        self.tick_seconds = tick_seconds
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, fn: Callable[[], Any], interval_seconds: float,
+                 is_good: Callable[[Any], bool] = lambda value: bool(value)) -> None:
+        with self._lock:
+            self._jobs[name] = {
+                "fn": fn,
+                "interval": interval_seconds,
+                "is_good": is_good,
+                "value": None,
+                "fetched_at": None,
+                "next_due": 0.0,
+                "running": False,
+                "last_error": None,
+            }
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.time()
+            with self._lock:
+                due = [name for name, job in self._jobs.items() if now >= job["next_due"]]
+            for name in due:
+                self.refresh(name)
+            self._stop.wait(self.tick_seconds)
+
+    @staticmethod
+    def _is_stale(job: Dict[str, Any], now: float) -> bool:
+        return job["fetched_at"] is None or now - job["fetched_at"] >= job["interval"]
+
+    def refresh(self, name: str) -> bool:
+        # Returns False when a refresh for this job is already in flight
+        with self._lock:
+            job = self._jobs[name]
+            if job["running"]:
+                return False
+            job["running"] = True
+        self._pool.submit(self._run, name)
+        return True
+
+    def _run(self, name: str) -> None:
+        job = self._jobs[name]
+        try:
+            value = job["fn"]()
+            error = None if job["is_good"](value) else "empty result"
+        except Exception as e:
+            logger.warning("Prefetch job %s failed: %s", name, e)
+            value, error = None, str(e)
+
+        now = time.time()
+        with self._lock:
+            job["running"] = False
+            job["last_error"] = error
+            if error is None:
+                job["value"] = value
+                job["fetched_at"] = now
+                job["next_due"] = now + job["interval"]
+            else:
+                # Keep serving the old value and retry sooner than a full interval
+                job["next_due"] = now + min(job["interval"], 60)
+
+    def get(self, name: str) -> Tuple[Any, Optional[float]]:
+        # Returns (value, fetched_at); (None, None) until the first good result lands
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is None:
+                return None, None
+            # A scheduler that was never started (prefetch disabled) revalidates nothing,
+            # so it serves nothing either and callers go through their own caches
+            if self._thread is None:
+                return None, None
+            value, fetched_at = job["value"], job["fetched_at"]
+            now = time.time()
+            stale = self._is_stale(job, now) and now >= job["next_due"]
+        if stale:
+            self.refresh(name)
+        return value, fetched_at
+
+    def put(self, name: str, value: Any) -> None:
+        # Lets a foreground computation seed the job so later readers are served instantly;
+        # only read back once the scheduler is running
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is not None and job["is_good"](value):
+                job["value"] = value
+                job["fetched_at"] = time.time()
+                job["next_due"] = job["fetched_at"] + job["interval"]
+
+    def is_refreshing(self, name: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(name)
+            return bool(job and job["running"])
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {"fetched_at": job["fetched_at"], "refreshing": job["running"], "last_error": job["last_error"]}
+                for name, job in self._jobs.items()
+            }
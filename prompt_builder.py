@@ -0,0 +1,204 @@
+# prompt_builder.py
+
+import math
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# ── Token Counting ─────────────────────────────────────────
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    # tiktoken is optional (and fetches its BPE file on first use); without it we
+    # fall back to the usual ~4 characters per token estimate
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _get_encoding()
+    if enc is not None:
+        return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens]).rstrip() + "…"
+    return text[:max_tokens * 4].rstrip() + "…"
+
+
+# ── Relevance Ranking ──────────────────────────────────────
+CENTRAL_BANK_TERMS = [
+    "fed", "fomc", "powell", "ecb", "lagarde", "boe", "bank of england", "boj", "bank of japan",
+    "pboc", "snb", "rba", "rbi", "norges", "banxico", "bcb", "sarb", "bank indonesia", "central bank",
+]
+MACRO_TERMS = [
+    "rate", "hike", "cut", "inflation", "cpi", "pce", "yield", "payrolls", "jobs", "gdp", "pmi",
+    "tariff", "intervention", "recession", "hawkish", "dovish", "forex", "fx", "currency",
+]
+CURRENCY_NAMES = {
+    "USD": ["usd", "dollar", "greenback"],
+    "EUR": ["eur", "euro"],
+    "GBP": ["gbp", "sterling", "pound"],
+    "JPY": ["jpy", "yen"],
+    "AUD": ["aud", "aussie", "australian dollar"],
+    "CAD": ["cad", "loonie", "canadian dollar"],
+    "INR": ["inr", "rupee"],
+    "CNH": ["cnh", "cny", "yuan", "renminbi"],
+    "CHF": ["chf", "swiss franc", "franc"],
+    "NOK": ["nok", "krone"],
+    "BRL": ["brl", "brazilian real"],
+    "ZAR": ["zar", "rand"],
+    "MXN": ["mxn", "peso"],
+    "IDR": ["idr", "rupiah"],
+}
+
+_SOURCE_RE = re.compile(r"\s\[([^\[\]]+)\]$")
+# Optional publish time at the end of the tag: " [Reuters, 2026-10-17 08:05 UTC]"
+_PUBLISHED_RE = re.compile(r"(?:^|,\s*)(\d{4}-\d{2}-\d{2} \d{2}:\d{2}) UTC$")
+
+# Recency weight halves for every this many hours of age
+RECENCY_HALF_LIFE_HOURS = 12.0
+
+
+def _term_pattern(terms: Sequence[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+
+
+_BASE_PATTERN = _term_pattern(CENTRAL_BANK_TERMS + MACRO_TERMS + [n for names in CURRENCY_NAMES.values() for n in names])
+
+
+def source_tag(source: Optional[str], published: Optional[float] = None) -> str:
+    # The trailing tag every snippet carries: provider for source balancing, publish
+    # time (UTC) for recency. Either part may be missing.
+    parts = [source] if source else []
+    if published:
+        parts.append(datetime.fromtimestamp(published, timezone.utc).strftime("%Y-%m-%d %H:%M UTC"))
+    return f" [{', '.join(parts)}]" if parts else ""
+
+
+def snippet_source(text: str) -> Optional[str]:
+    match = _SOURCE_RE.search(text)
+    if match is None:
+        return None
+    source = _PUBLISHED_RE.sub("", match.group(1)).strip().lower()
+    return source or None
+
+
+def snippet_published(text: str) -> Optional[float]:
+    match = _SOURCE_RE.search(text)
+    stamp = _PUBLISHED_RE.search(match.group(1)) if match else None
+    if stamp is None:
+        return None
+    return datetime.strptime(stamp.group(1), "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc).timestamp()
+
+
+def strip_source(text: str) -> str:
+    # The snippet without its trailing " [Provider, date]" tag (see source_tag)
+    match = _SOURCE_RE.search(text)
+    return text[:match.start()] if match else text
+
+
+def relevance_scores(items: List[Tuple[str, int]], focus: Sequence[str] = (),
+                     now: Optional[float] = None) -> List[float]:
+    # Recency decays with age when a snippet carries its publish time; without one,
+    # upstream rank order (items arrive in it) stands in
+    focus_terms = [n for code in focus for n in CURRENCY_NAMES.get(code.upper(), [code.lower()])]
+    focus_pattern = _term_pattern(focus_terms) if focus_terms else None
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+
+    n = len(items)
+    scores = []
+    for i, (text, weight) in enumerate(items):
+        published = snippet_published(text)
+        if published is not None:
+            recency = 0.5 ** (max(now - published, 0.0) / 3600 / RECENCY_HALF_LIFE_HOURS)
+        else:
+            recency = 1.0 - i / n
+        keyword_hits = min(len(_BASE_PATTERN.findall(text)), 5) / 5
+        focus_hits = min(len(focus_pattern.findall(text)), 3) / 3 if focus_pattern else 0.0
+        coverage = min(weight - 1, 4) / 4
+        scores.append(1.0 * recency + 1.5 * keyword_hits + 2.0 * focus_hits + 0.5 * coverage)
+    return scores
+
+
+# ── Budgeted Selection ─────────────────────────────────────
+class PromptBuild(NamedTuple):
+    prompt: str
+    prompt_tokens: int
+    snippet_tokens: int
+    included: int
+    dropped: int
+
+
+def format_item(text: str, weight: int) -> str:
+    return f"- {text} (×{weight})" if weight > 1 else f"- {text}"
+
+
+def _truncate_body(text: str, max_tokens: int) -> str:
+    # Long descriptions are cut, but a trailing [source] tag is kept
+    body = strip_source(text)
+    return truncate_to_tokens(body, max_tokens) + text[len(body):]
+
+
+def select_snippets(items: List[Tuple[str, int]], budget_tokens: int, focus: Sequence[str] = (),
+                    max_item_tokens: int = 120, diversity_penalty: float = 0.7) -> Tuple[List[str], int]:
+    """Pick the most relevant (text, weight) items whose lines fit in budget_tokens.
+
+    Selection is greedy on relevance, with each further item from an already-used
+    source discounted by diversity_penalty. Chosen lines keep their original order.
+    Returns the formatted lines and their token total.
+    """
+    if not items:
+        return [], 0
+
+    base = relevance_scores(items, focus)
+    lines = [format_item(_truncate_body(text, max_item_tokens), weight) for text, weight in items]
+    costs = [count_tokens(line) + 1 for line in lines]  # +1 for the joining newline
+
+    remaining = set(range(len(items)))
+    per_source: Dict[Optional[str], int] = {}
+    chosen, used = [], 0
+    while remaining:
+        def adjusted(i):
+            src = snippet_source(items[i][0])
+            return base[i] * (diversity_penalty ** per_source.get(src, 0) if src else 1.0)
+
+        best = max(remaining, key=adjusted)
+        remaining.discard(best)
+        if used + costs[best] > budget_tokens:
+            continue
+        chosen.append(best)
+        used += costs[best]
+        src = snippet_source(items[best][0])
+        per_source[src] = per_source.get(src, 0) + 1
+
+    chosen.sort()
+    return [lines[i] for i in chosen], used
+
+
+def build_prompt(prefix: str, items: List[Tuple[str, int]], budget_tokens: int, focus: Sequence[str] = (),
+                 max_item_tokens: int = 120) -> PromptBuild:
+    # prefix is emitted byte-for-byte first so provider-side prefix caching can reuse it
+    lines, used = select_snippets(items, budget_tokens, focus, max_item_tokens)
+    prompt = prefix + "\n".join(lines) + "\n"
+    return PromptBuild(
+        prompt=prompt,
+        prompt_tokens=count_tokens(prompt),
+        snippet_tokens=used,
+        included=len(lines),
+        dropped=len(items) - len(lines),
+    )
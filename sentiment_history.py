@@ -0,0 +1,99 @@
+# sentiment_history.py
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from analysis_cache import DEFAULT_CACHE_PATH
+
+# Overall sentiment labels on a -1..1 scale, for charting
+TONE_SCORES = {
+    "positive": 1.0,
+    "trending positive": 0.5,
+    "neutral": 0.0,
+    "trending negative": -0.5,
+    "negative": -1.0,
+}
+
+
+def tone_score(label: str) -> float:
+    return TONE_SCORES.get(label.strip().lower(), 0.0)
+
+
+class TrendPoint(NamedTuple):
+    ts: float
+    tone: float
+    balance: float
+    positive: int
+    neutral: int
+    negative: int
+    samples: int
+
+
+# ── Sentiment Time Series ──────────────────────────────────
+class SentimentHistory:
+    """Append-only SQLite log of analysis results, indexed by (scope, ts).
+
+    trend() buckets rows inside SQLite, so a chart over months of history only ever
+    receives max_points rows.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_history (
+                id INTEGER PRIMARY KEY,
+                scope TEXT NOT NULL,
+                ts REAL NOT NULL,
+                overall_sentiment TEXT NOT NULL,
+                tone REAL NOT NULL,
+                positive INTEGER NOT NULL,
+                neutral INTEGER NOT NULL,
+                negative INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sentiment_history_scope_ts ON sentiment_history (scope, ts)")
+
+    def record(self, scope: str, overall_sentiment: str, counts: Dict[str, int], model: str,
+               prompt_version: str, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sentiment_history (scope, ts, overall_sentiment, tone, positive, neutral, negative, model, prompt_version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, ts, overall_sentiment, tone_score(overall_sentiment), int(counts.get("positive", 0)),
+                 int(counts.get("neutral", 0)), int(counts.get("negative", 0)), model, prompt_version),
+            )
+
+    def scopes(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT scope FROM sentiment_history ORDER BY scope")]
+
+    def trend(self, scope: str, start_ts: float, end_ts: Optional[float] = None, max_points: int = 200) -> List[TrendPoint]:
+        # Equal-width time buckets, averaged in SQL. balance is (positive - negative) / headlines,
+        # taken over the bucket's summed counts.
+        end_ts = time.time() if end_ts is None else end_ts
+        width = max((end_ts - start_ts) / max(max_points, 1), 1e-6)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT MAX(ts), AVG(tone), SUM(positive), SUM(neutral), SUM(negative), COUNT(*) "
+                "FROM sentiment_history WHERE scope = ? AND ts >= ? AND ts <= ? "
+                "GROUP BY CAST((ts - ?) / ? AS INTEGER) ORDER BY 1",
+                (scope, start_ts, end_ts, start_ts, width),
+            ).fetchall()
+        points = []
+        for ts, tone, pos, neu, neg, n in rows:
+            total = pos + neu + neg
+            points.append(TrendPoint(ts, tone, (pos - neg) / total if total else 0.0, pos, neu, neg, n))
+        return points
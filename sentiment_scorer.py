@@ -0,0 +1,144 @@
+# sentiment_scorer.py
+
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from prompt_builder import strip_source
+
+# ── FX Lexicon ─────────────────────────────────────────────
+# Weights read as "good or bad news for risk appetite and the currency in the
+# headline". Entries match whole words; a trailing * matches any word starting
+# with the stem ("strengthen*" covers "strengthens", "strengthened").
+FX_LEXICON: Dict[str, float] = {
+    # price action
+    "rally": 1.0, "rallies": 1.0, "rallied": 1.0, "surge*": 1.0, "soar*": 1.0, "jump*": 0.7, "climb*": 0.6,
+    "gain*": 0.6, "rise": 0.4, "rises": 0.4, "rising": 0.4, "rose": 0.4, "rebound*": 0.8, "recover*": 0.7,
+    "advance*": 0.5, "strengthen*": 0.8, "firmer": 0.4, "high": 0.3, "highs": 0.3,
+    "slump*": -1.0, "plunge*": -1.0, "tumble*": -1.0, "crash*": -1.2, "sink*": -0.8, "sank": -0.8, "slide*": -0.7,
+    "drop*": -0.6, "fall": -0.5, "falls": -0.5, "falling": -0.5, "fell": -0.5, "declin*": -0.5, "weaken*": -0.8,
+    "selloff": -1.0, "sell-off": -1.0, "retreat*": -0.5, "lose": -0.5, "loses": -0.5, "losses": -0.5,
+    "slip*": -0.4, "low": -0.3, "lows": -0.3,
+    # data and outlook
+    "beat": 0.8, "beats": 0.8, "better-than-expected": 1.0, "stronger-than-expected": 1.0, "upbeat": 0.8,
+    "robust": 0.7, "resilien*": 0.7, "optimis*": 0.8, "confidence": 0.4, "boost*": 0.7, "upgrade*": 0.8,
+    "expansion": 0.4, "growth": 0.3, "recovery": 0.7, "stimulus": 0.5, "truce": 0.7, "ceasefire": 0.8,
+    "tailwind*": 0.6, "risk-on": 0.8,
+    "miss": -0.8, "misses": -0.8, "missed": -0.8, "worse-than-expected": -1.0, "weaker-than-expected": -1.0,
+    "gloom*": -0.9, "pessimis*": -0.8, "slowdown": -0.8, "slowing": -0.5, "contraction": -0.9, "contracted": -0.7,
+    "recession*": -1.2, "stagflation*": -1.1, "downgrade*": -0.9, "default*": -1.0, "crisis": -1.1,
+    "turmoil": -1.0, "volatil*": -0.4, "uncertain*": -0.5, "fear*": -0.8, "worr*": -0.7, "concern*": -0.5,
+    "risk-off": -0.8, "tariff*": -0.6, "sanction*": -0.6, "war": -0.9, "wars": -0.9, "tension*": -0.7,
+    "escalat*": -0.8, "threat*": -0.6, "shutdown": -0.7, "layoff*": -0.8, "unemployment": -0.4, "deficit*": -0.3,
+    "headwind*": -0.6, "pressure*": -0.4,
+}
+
+NEGATORS = {"no", "not", "never", "without", "fail", "fails", "failed", "unlikely", "hardly", "nor"}
+
+# A negator flips the lexicon hits among the next NEGATION_WINDOW tokens
+NEGATION_WINDOW = 3
+# |score| at or below this is neutral
+NEUTRAL_BAND = 0.15
+
+_TOKEN_RE = re.compile(r"[a-z][a-z'-]*")
+
+
+class HeadlineScores(NamedTuple):
+    scores: np.ndarray
+    labels: List[str]
+    counts: Dict[str, int]
+
+
+# ── Vectorized Scorer ──────────────────────────────────────
+class LexiconScorer:
+    """Linear bag-of-words scorer over an FX lexicon with short-range negation.
+
+    Token lookup is the only per-token Python work; weighting, negation and the
+    per-headline sums run as flat NumPy passes over every token of the batch.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None, negators=NEGATORS,
+                 negation_window: int = NEGATION_WINDOW, neutral_band: float = NEUTRAL_BAND):
+        lexicon = FX_LEXICON if lexicon is None else lexicon
+        self.negation_window = negation_window
+        self.neutral_band = neutral_band
+        entries = list(lexicon.items())
+        self._weights = np.array([0.0] + [w for _, w in entries])
+        self._words = {term: i + 1 for i, (term, _) in enumerate(entries) if not term.endswith("*")}
+        # Longest stem first, so the most specific one wins
+        self._stems = sorted(((term[:-1], i + 1) for i, (term, _) in enumerate(entries) if term.endswith("*")),
+                             key=lambda st: len(st[0]), reverse=True)
+        self._negators = set(negators)
+        # token -> lexicon id (0 = no hit, -1 = negator); filled lazily so each distinct word is resolved once
+        self._vocab: Dict[str, int] = {}
+
+    def _lookup(self, token: str) -> int:
+        tid = self._vocab.get(token)
+        if tid is None:
+            if token in self._negators or token.endswith("n't"):
+                tid = -1
+            else:
+                tid = self._words.get(token) or next((i for stem, i in self._stems if token.startswith(stem)), 0)
+            self._vocab[token] = tid
+        return tid
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        # One score in [-1, 1] per text
+        if not texts:
+            return np.zeros(0)
+        ids, lengths = [], []
+        for text in texts:
+            # Typographic apostrophes (common in news copy) count as plain ones, so "doesn’t" negates
+            tokens = _TOKEN_RE.findall(strip_source(text).lower().replace("\u2019", "'"))
+            ids.extend(self._lookup(t) for t in tokens)
+            lengths.append(len(tokens))
+        if not ids:
+            return np.zeros(len(texts))
+        ids = np.array(ids, dtype=np.int64)
+        lengths = np.array(lengths, dtype=np.int64)
+        doc = np.repeat(np.arange(len(texts)), lengths)
+
+        # Negators seen in the previous negation_window tokens of the same headline
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pos = np.arange(ids.size)
+        neg_cum = np.concatenate(([0], np.cumsum(ids == -1)))
+        window_start = np.maximum(pos - self.negation_window, starts)
+        negated = (neg_cum[pos] - neg_cum[window_start]) % 2 == 1
+
+        weights = self._weights[np.maximum(ids, 0)] * np.where(negated, -1.0, 1.0)
+        raw = np.bincount(doc, weights=weights, minlength=len(texts))
+        # Damp long descriptions so a wordy article does not outscore a sharp headline
+        return np.tanh(raw / np.sqrt(np.maximum(lengths, 1) / 8.0 + 1.0))
+
+    def labels(self, scores: np.ndarray) -> List[str]:
+        out = np.full(scores.shape, "neutral", dtype=object)
+        out[scores > self.neutral_band] = "positive"
+        out[scores < -self.neutral_band] = "negative"
+        return out.tolist()
+
+    def counts(self, scores: np.ndarray) -> Dict[str, int]:
+        return {
+            "positive": int(np.count_nonzero(scores > self.neutral_band)),
+            "neutral": int(np.count_nonzero(np.abs(scores) <= self.neutral_band)),
+            "negative": int(np.count_nonzero(scores < -self.neutral_band)),
+        }
+
+    def score_headlines(self, texts: List[str]) -> HeadlineScores:
+        scores = self.score(texts)
+        return HeadlineScores(scores, self.labels(scores), self.counts(scores))
+
+
+_default_scorer: Optional[LexiconScorer] = None
+
+
+def default_scorer() -> LexiconScorer:
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = LexiconScorer()
+    return _default_scorer
+
+
+def sentiment_counts(texts: List[str]) -> Dict[str, int]:
+    scorer = default_scorer()
+    return scorer.counts(scorer.score(texts))
@@ -0,0 +1,66 @@
+# single_flight.py
+
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+# ── In-Flight Deduplication ────────────────────────────────
+class SingleFlight:
+    """Collapses concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait and receive the same result or exception. Nothing is kept once the
+    call finishes, so this complements caches rather than replacing them. Keys are
+    tuples whose first element names the operation, which is what stats() groups by.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed: Counter = Counter()
+        self.coalesced: Counter = Counter()
+
+    def do(self, key: Tuple, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed[key[0]] += 1
+            else:
+                self.coalesced[key[0]] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            names = set(self.executed) | set(self.coalesced)
+            return {name: {"executed": self.executed[name], "coalesced": self.coalesced[name]} for name in sorted(names)}
@@ -0,0 +1,78 @@
+# stream_parser.py
+
+import ast
+import json
+import re
+from typing import List
+
+_KEY_RE = re.compile(r"""["']summary_points["']\s*:\s*\[""")
+
+
+# ── Incremental Summary-Point Parser ───────────────────────
+class SummaryPointStream:
+    """Pulls completed "summary_points" entries out of a streamed JSON/dict response.
+
+    feed() accepts raw completion deltas and returns the points that became complete
+    with that chunk, so each insight can be rendered before the object is closed.
+    Both double-quoted JSON and single-quoted Python dict literals are understood.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.points: List[str] = []
+        self._pos = 0
+        self._state = "seek"
+        self._quote = ""
+        self._start = 0
+        self._escaped = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> List[str]:
+        self.buffer += chunk
+        emitted = []
+        buf = self.buffer
+
+        while self._pos < len(buf) and self._state != "done":
+            if self._state == "seek":
+                match = _KEY_RE.search(buf, self._pos)
+                if match is None:
+                    # Keep a tail so a key split across chunks is still found
+                    self._pos = max(self._pos, len(buf) - 32)
+                    break
+                self._pos = match.end()
+                self._state = "array"
+
+            elif self._state == "array":
+                ch = buf[self._pos]
+                if ch in "\"'":
+                    self._state, self._quote, self._start, self._escaped = "string", ch, self._pos, False
+                elif ch == "]":
+                    self._state = "done"
+                self._pos += 1
+
+            else:  # inside a string literal
+                ch = buf[self._pos]
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == self._quote:
+                    point = self._decode(buf[self._start:self._pos + 1])
+                    self.points.append(point)
+                    emitted.append(point)
+                    self._state = "array"
+                self._pos += 1
+
+        return emitted
+
+    @staticmethod
+    def _decode(literal: str) -> str:
+        try:
+            if literal[0] == '"':
+                return json.loads(literal)
+            return ast.literal_eval(literal)
+        except (ValueError, SyntaxError):
+            return literal[1:-1]
@@ -0,0 +1,38 @@
+# tests/conftest.py
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core  # noqa: E402
+
+ANALYSIS = {
+    "summary_points": [f"**Point {i}** Cause, effect and implication." for i in range(1, 6)],
+    "overall_sentiment": "Neutral",
+    "sentiment_explainer": "Mixed signals.",
+}
+
+
+@pytest.fixture
+def offline_core(tmp_path, monkeypatch):
+    """core configured against a throwaway cache, with model calls answered locally.
+
+    The fixture value is the list of (call, prompt) pairs the fake model received.
+    """
+    core.configure({"cache": {"path": str(tmp_path / "cache.sqlite")}, "feeds": {"enabled": False}})
+    calls = []
+
+    def complete(prompt, on_point=None, call="analysis"):
+        calls.append((call, prompt))
+        if call == "batch":
+            pairs = [line[4:] for line in prompt.splitlines() if line.startswith("### ")]
+            return json.dumps({pair: ANALYSIS for pair in pairs})
+        return json.dumps(ANALYSIS)
+
+    monkeypatch.setattr(core, "complete_analysis_prompt", complete)
+    yield calls
+    core.configure({})
@@ -0,0 +1,48 @@
+# tests/test_batch_analysis.py
+
+import core
+
+PAIRS = ["EUR/USD", "USD/JPY", "EUR/GBP"]
+
+
+def load(pair):
+    return [f"{pair} moves on central bank outlook, story {i}" for i in range(6)]
+
+
+def run_watchlist():
+    results = {}
+    core.analyze_pairs_batched(PAIRS, lambda pair, result, error: results.__setitem__(pair, (result, error)), load=load)
+    return results
+
+
+def test_unparseable_batch_falls_back_per_pair(offline_core, monkeypatch):
+    single = core.complete_analysis_prompt
+
+    def complete(prompt, on_point=None, call="analysis"):
+        if call == "batch":
+            offline_core.append((call, prompt))
+            return "Sorry, I can't help with that."
+        return single(prompt, on_point, call)
+
+    monkeypatch.setattr(core, "complete_analysis_prompt", complete)
+    results = run_watchlist()
+
+    assert all(error is None and result[0] for result, error in results.values())
+    assert [call for call, _ in offline_core].count("analysis") == len(PAIRS)
+
+
+def test_failed_fallback_only_fails_its_pair(offline_core, monkeypatch):
+    single = core.complete_analysis_prompt
+
+    def complete(prompt, on_point=None, call="analysis"):
+        if call == "batch":
+            return '{"EUR/USD": ' + single(prompt, on_point, call="analysis") + "}"
+        if "USD/JPY" in prompt:
+            raise RuntimeError("upstream down")
+        return single(prompt, on_point, call)
+
+    monkeypatch.setattr(core, "complete_analysis_prompt", complete)
+    results = run_watchlist()
+
+    assert results["EUR/USD"][1] is None and results["EUR/GBP"][1] is None
+    assert results["USD/JPY"][0] is None and "upstream down" in results["USD/JPY"][1]
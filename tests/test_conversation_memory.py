@@ -0,0 +1,44 @@
+# tests/test_conversation_memory.py
+
+import logging
+
+import core
+from conversation_memory import ConversationMemory
+
+
+def long_conversation(turns=10):
+    memory = ConversationMemory("Summary of recent FX sentiment:\n- Dollar firm", window_tokens=60, summary_tokens=30)
+    for i in range(turns):
+        memory.add("user" if i % 2 == 0 else "assistant", f"Message {i} about the euro outlook " * 4)
+    return memory
+
+
+def compactions(result):
+    rows = core.get_metrics().counter_rows("chat_compactions_total")
+    return sum(r["value"] for r in rows if r["result"] == result)
+
+
+def test_compaction_failure_is_logged_counted_and_bounded(offline_core, monkeypatch, caplog):
+    def fail(*args):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(core, "summarize_conversation", fail)
+    memory = long_conversation()
+    failures = compactions("failed")
+
+    with caplog.at_level(logging.WARNING, logger="core"):
+        assert core.compact_conversation(memory) is False
+
+    assert compactions("failed") == failures + 1
+    assert "model unavailable" in caplog.text
+    # The overflow still leaves the window, so the next prompt stays within budget
+    assert memory.window_start > 0 and memory.overflow() == []
+    assert memory.summary == ""
+
+
+def test_compaction_folds_overflow_into_summary(offline_core, monkeypatch):
+    monkeypatch.setattr(core, "summarize_conversation", lambda prev, turns, max_tokens: f"{len(turns)} turns")
+    memory = long_conversation()
+
+    assert core.compact_conversation(memory) is True
+    assert memory.summary.endswith("turns") and memory.window_start > 0
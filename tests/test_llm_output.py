@@ -0,0 +1,40 @@
+# tests/test_llm_output.py
+
+import json
+
+import core
+from conftest import ANALYSIS
+from llm_output import parse_analysis, validate_analysis
+
+
+def test_fenced_python_dict_with_prose_parses():
+    text = "Here you go:\n```python\n" + repr(ANALYSIS) + "\n```\nAnything else?"
+    parsed = parse_analysis(text)
+    assert parsed.fields == ANALYSIS and parsed.missing == [] and parsed.repaired
+
+
+def test_truncated_reply_keeps_complete_fields():
+    text = json.dumps(ANALYSIS)
+    parsed = parse_analysis(text[:text.index("Mixed") + 3])
+    assert parsed.fields["overall_sentiment"] == "Neutral"
+    assert parsed.missing == ["sentiment_explainer"]
+
+
+def test_too_few_points_are_partial():
+    parsed = validate_analysis({**ANALYSIS, "summary_points": ANALYSIS["summary_points"][:2]})
+    assert parsed.missing == ["summary_points"]
+    assert len(parsed.fields["summary_points"]) == 2
+
+
+def test_partial_points_are_completed_by_follow_up(offline_core):
+    partial = {**ANALYSIS, "summary_points": ANALYSIS["summary_points"][:2]}
+    fields = core.resolve_analysis(validate_analysis(partial), "- headline", "analysis")
+
+    assert fields["summary_points"] == ANALYSIS["summary_points"]
+    (call, prompt), = offline_core
+    assert call == "repair" and "the remaining 3 of the FIVE insights" in prompt
+
+
+def test_prompts_ask_for_json():
+    for prompt in (core.ANALYSIS_INSTRUCTIONS, core.BATCH_INSTRUCTIONS):
+        assert "valid JSON object" in prompt and "Python dictionary" not in prompt
@@ -0,0 +1,41 @@
+# tests/test_prefetch_scheduler.py
+
+import time
+
+from prefetch_scheduler import PrefetchScheduler
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_never_started_scheduler_serves_nothing():
+    calls = []
+    scheduler = PrefetchScheduler()
+    scheduler.register("headlines", lambda: calls.append(1) or ["fresh"], interval_seconds=60)
+    scheduler.put("headlines", ["seeded"])
+    try:
+        assert scheduler.get("headlines") == (None, None)
+        assert scheduler.get("unknown") == (None, None)
+        assert calls == []
+    finally:
+        scheduler.stop()
+
+
+def test_started_scheduler_serves_seeded_value_and_refreshes_when_stale():
+    results = iter([["first"], ["second"]])
+    scheduler = PrefetchScheduler(tick_seconds=0.05)
+    scheduler.register("headlines", lambda: next(results), interval_seconds=0.2)
+    scheduler.put("headlines", ["seeded"])
+    scheduler.start()
+    try:
+        value, fetched_at = scheduler.get("headlines")
+        assert value == ["seeded"] and fetched_at is not None
+        assert wait_for(lambda: scheduler.get("headlines")[0] == ["first"])
+    finally:
+        scheduler.stop()
@@ -0,0 +1,38 @@
+# tests/test_prompt_builder.py
+
+from headline_dedup import shingles
+from prompt_builder import relevance_scores, snippet_published, snippet_source, source_tag, strip_source
+
+NOW = 1_800_000_000.0
+
+
+def snippet(text, source, hours_ago=None):
+    return text + source_tag(source, None if hours_ago is None else NOW - hours_ago * 3600)
+
+
+def test_tag_round_trip():
+    text = snippet("Dollar slips", "Reuters", hours_ago=2)
+    assert snippet_source(text) == "reuters"
+    assert abs(snippet_published(text) - (NOW - 2 * 3600)) < 60  # minute precision
+    assert strip_source(text) == "Dollar slips"
+    assert snippet_source(snippet("Dollar slips", None, hours_ago=2)) is None
+    assert snippet_published("Dollar slips [Reuters]") is None
+
+
+def test_newer_feed_item_outranks_older_search_results():
+    # Feed snippets are appended after the search results but can be the newest
+    items = [(snippet("Markets drift", "Bing", hours_ago=h), 1) for h in (20, 22, 24)]
+    items.append((snippet("Markets drift", "Fed press release", hours_ago=0.5), 1))
+    scores = relevance_scores(items, now=NOW)
+    assert scores[-1] == max(scores)
+
+
+def test_undated_items_fall_back_to_rank():
+    items = [(f"Markets drift {i} [Wire]", 1) for i in range(4)]
+    scores = relevance_scores(items, now=NOW)
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_shingles_ignore_the_source_tag():
+    text = "Dollar slips as Fed signals patience"
+    assert shingles(snippet(text, "Reuters", 1)) == shingles(snippet(text, "Bloomberg", 3))
@@ -0,0 +1,37 @@
+# tests/test_sentiment_history.py
+
+import core
+
+SNIPPETS = [f"Yen rallies as BoJ signals tightening, story {i} [Wire]" for i in range(8)]
+
+
+def history_rows(scope):
+    return core.get_sentiment_history().trend(scope, 0)
+
+
+def test_identical_calls_record_one_point(offline_core):
+    core.analyze_incremental("global", SNIPPETS)
+    core.analyze_incremental("global", SNIPPETS)
+
+    assert sum(p.samples for p in history_rows("global")) == 1
+
+
+def test_disk_cache_hit_records_nothing(offline_core):
+    core.analyze_incremental("EUR/USD", SNIPPETS)
+    core.get_headline_store().reset()
+    core.analyze_incremental("EUR/USD", SNIPPETS)
+
+    assert sum(p.samples for p in history_rows("EUR/USD")) == 1
+    assert len(offline_core) == 1
+
+
+def test_batched_watchlist_records_each_pair_once(offline_core):
+    pairs = ["EUR/USD", "USD/JPY"]
+
+    def load(pair):
+        return [f"{pair} moves on central bank outlook, story {i}" for i in range(6)]
+
+    for _ in range(2):
+        core.analyze_pairs_batched(pairs, lambda *a: None, load=load)
+
+    assert [sum(p.samples for p in history_rows(pair)) for pair in pairs] == [1, 1]
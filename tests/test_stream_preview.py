@@ -0,0 +1,41 @@
+# tests/test_stream_preview.py
+
+import json
+
+import core
+from conftest import ANALYSIS
+
+SNIPPETS = [f"Sterling slips as gilt yields fall, story {i} [Wire]" for i in range(10)]
+POINTS = ANALYSIS["summary_points"]
+
+
+def test_fallback_rebuild_does_not_restream_points(offline_core, monkeypatch):
+    core.analyze_incremental("GBP/USD", SNIPPETS)
+
+    def complete(prompt, on_point=None, call="analysis"):
+        for point in POINTS:
+            on_point(point)
+        if call == "incremental":
+            raise RuntimeError("stream dropped")
+        return json.dumps(ANALYSIS)
+
+    monkeypatch.setattr(core, "complete_analysis_prompt", complete)
+    streamed = []
+    core.analyze_incremental("GBP/USD", SNIPPETS + ["Sterling extends losses after CPI miss [Wire]"], streamed.append)
+
+    assert streamed == POINTS
+
+
+def test_repair_streams_only_the_missing_points(offline_core, monkeypatch):
+    def complete(prompt, on_point=None, call="analysis"):
+        if call == "repair":
+            return json.dumps({"summary_points": POINTS})
+        for point in POINTS[:3]:
+            on_point(point)
+        return json.dumps(dict(ANALYSIS, summary_points=POINTS[:3]))
+
+    monkeypatch.setattr(core, "complete_analysis_prompt", complete)
+    streamed = []
+    bullets = core.run_analysis(SNIPPETS, streamed.append)[0]
+
+    assert streamed == bullets == POINTS